@@ -4,24 +4,188 @@ Projection Information Source: https://developers.arcgis.com/rest/services-refer
 Geographic Projection Source:
 """
 import os
-import json
-import pandas as pd
+import sys
+import zlib
+import sqlite3
+import pathlib
+import functools
+import threading
+from collections import namedtuple
+
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+try:
+    from importlib.resources import files as _files
+
+    _ROOT = _files(__package__)
+except ImportError:
+    _ROOT = pathlib.Path(os.path.dirname(__file__))
+
+__all__ = ["lookup_coordinate_system", "info", "Projection"]
+# ----------------------------------------------------------------------
+_records = {}
+_ALIASES = {102100: 3857}
+_canon = _ALIASES.get
+_db_lock = threading.Lock()
+_FP = _ROOT / "prj.json"
+_DB = _ROOT / "prj.sqlite"
+########################################################################
+class Projection(namedtuple("Projection", "WKID NAME WKT")):
+    """
+    An immutable coordinate system record.  Values can be read as
+    attributes or by key, ie: `prj.WKT` or `prj['WKT']`.
+    """
+
+    __slots__ = ()
+
+    # ----------------------------------------------------------------------
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        return super().__getitem__(key)
+
+    # ----------------------------------------------------------------------
+    def keys(self):
+        """returns the record's field names"""
+        return self._fields
+
+
+# ----------------------------------------------------------------------
+def _once(func):
+    """
+    wraps a loader so it runs a single time, even when the first calls
+    come from several threads, and then returns the stored result
+    """
+    lock = threading.Lock()
+    result = []
+
+    @functools.wraps(func)
+    def wrapper():
+        if not result:
+            with lock:
+                if not result:
+                    result.append(func())
+        return result[0]
+
+    wrapper.cache_clear = result.clear
+    return wrapper
+
+
+# ----------------------------------------------------------------------
+def _read_json():
+    """reads the prj.json file as (wkid, name, wkt) rows"""
+    with _FP.open("rb") as reader:
+        data = _json.loads(reader.read())
+    return list(
+        zip(map(int, data["Well-known ID"]), data["Name"], data["Well-known text"])
+    )
+
+
+# ----------------------------------------------------------------------
+def _prj_checksum():
+    """
+    returns the CRC32 of prj.json the build stores as the prj.sqlite
+    user_version, masked to fit SQLite's signed 32-bit integer
+    """
+    return zlib.crc32(_FP.read_bytes()) & 0x7FFFFFFF
+
+
+# ----------------------------------------------------------------------
+@_once
+def _connect():
+    """
+    opens the prj.sqlite index built with the package read-only.  Returns
+    None when it is missing or was not built from the shipped prj.json,
+    in which case the lookups read prj.json instead.
+    """
+    try:
+        uri = pathlib.Path(os.fspath(_DB)).resolve().as_uri() + "?mode=ro"
+        con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        if version != _prj_checksum():
+            con.close()
+            return None
+        con.execute("PRAGMA mmap_size=8388608")
+        return con
+    except (sqlite3.Error, OSError, TypeError):
+        return None
+
 
-__all__ = ["lookup_coordinate_system", "info"]
 # ----------------------------------------------------------------------
-_lutbl = None
+def _split_wkt(wkt):
+    """
+    splits a PROJCS wkt around its GEOGCS block so the block, which is
+    repeated across many projections, is stored only once
+    """
+    start = wkt.find("GEOGCS[")
+    if not wkt.startswith("PROJCS[") or start < 0:
+        return (wkt,)
+    depth = 0
+    for end in range(start + 6, len(wkt)):
+        if wkt[end] == "[":
+            depth += 1
+        elif wkt[end] == "]":
+            depth -= 1
+            if depth == 0:
+                break
+    end += 1
+    return (wkt[:start], sys.intern(wkt[start:end]), wkt[end:])
+
+
 # ----------------------------------------------------------------------
-def _load_data():
-    """loads the coordinate information into memory"""
+def _build_index():
+    """loads every coordinate system from prj.sqlite or prj.json"""
+    rows = None
+    con = _connect()
+    if con is not None:
+        try:
+            with _db_lock:
+                rows = con.execute("SELECT wkid, name, wkt FROM prj").fetchall()
+        except sqlite3.Error:
+            rows = None
+    if rows is None:
+        rows = _read_json()
+    return {wkid: (name, _split_wkt(wkt)) for wkid, name, wkt in rows}
 
-    _fp = r"%s\prj.json" % os.path.dirname(__file__)
-    global _lutbl
-    if _lutbl is None:
-        with open(_fp, "r") as reader:
-            _lutbl = pd.DataFrame(json.loads(reader.read()))
-            _lutbl.columns = ["WKID", "NAME", "WKT"]
-            del reader
-    return _lutbl
+
+_load_data = _once(_build_index)
+
+
+# ----------------------------------------------------------------------
+def _query_db(con, wkids):
+    """reads the (wkid, name, wkt) rows for a list of wkids from prj.sqlite"""
+    rows = []
+    for i in range(0, len(wkids), 500):
+        chunk = wkids[i : i + 500]
+        sql = "SELECT wkid, name, wkt FROM prj WHERE wkid IN (%s)" % ",".join(
+            "?" * len(chunk)
+        )
+        with _db_lock:
+            rows.extend(con.execute(sql, chunk).fetchall())
+    return rows
+
+
+# ----------------------------------------------------------------------
+def _build_records(wkids):
+    """creates and caches the Projection records for a list of wkids"""
+    rows = None
+    con = _connect()
+    if con is not None:
+        try:
+            rows = _query_db(con, wkids)
+        except sqlite3.Error:
+            rows = None
+    if rows is None:
+        index = _load_data()
+        rows = [(w, index[w][0], "".join(index[w][1])) for w in wkids if w in index]
+    for wkid, name, wkt in rows:
+        _records.setdefault(wkid, Projection(wkid, name, wkt))
 
 
 # ----------------------------------------------------------------------
@@ -35,7 +199,7 @@ def lookup_coordinate_system(wkid):
     wkid                 Requred Integer/List. The SRS identifier.
     ================     =========================================
 
-    :returns: list of dictionaries
+    :returns: list of Projection records (read-only, dictionary style access)
 
     [
       {
@@ -47,20 +211,44 @@ def lookup_coordinate_system(wkid):
 
 
     """
-    if wkid == 102100:
-        wkid = 3857
-    global _lutbl
-    if _lutbl is None:
-        _load_data()
-    if isinstance(wkid, (int, float)):
-        q = _lutbl["WKID"] == int(wkid)
-    elif isinstance(wkid, (list, tuple)):
-        q = _lutbl["WKID"].isin(wkid)
+    t = type(wkid)
+    if t is int:
+        wkid = _canon(wkid, wkid)
+        rec = _records.get(wkid)
+        if rec is None:
+            _build_records([wkid])
+            rec = _records.get(wkid)
+            if rec is None:
+                raise ValueError("Invalid WKID")
+        return [rec]
+    elif t in (list, tuple) or isinstance(wkid, (list, tuple)):
+        wkids = list(dict.fromkeys(_canon(w, w) for w in map(int, wkid)))
+    elif isinstance(wkid, (int, float)):
+        wkid = int(wkid)
+        wkids = [_canon(wkid, wkid)]
     else:
         raise ValueError("Invalid wkid. Must be int or list.")
-    if len(_lutbl[q]) == 0:
+    missing = [w for w in wkids if w not in _records]
+    if missing:
+        _build_records(missing)
+    results = [_records[w] for w in wkids if w in _records]
+    if len(results) == 0:
         raise ValueError("Invalid WKID")
-    return _lutbl[q].to_dict("records")
+    return results
+
+
+# ----------------------------------------------------------------------
+@_once
+def _get_dataframe():
+    """builds the pandas view of the coordinate index"""
+    import pandas as pd
+
+    df = pd.DataFrame(
+        [[wkid, name, "".join(wkt)] for wkid, (name, wkt) in _load_data().items()],
+        columns=["WKID", "NAME", "WKT"],
+    )
+    df["WKID"] = df["WKID"].astype("int32")
+    return df
 
 
 # ----------------------------------------------------------------------
@@ -69,7 +257,4 @@ def info():
 
     :returns: pd.DataFrame
     """
-    global _lutbl
-    if _lutbl is None:
-        _lutbl = _load_data()
-    return _lutbl
+    return _get_dataframe()
@@ -2,12 +2,16 @@ import os
 import sys
 import json
 import sqlite3
-from typing import Generator
-from typing import Union, Any, Dict
+import struct
+import functools
+from typing import Iterator
+from typing import Union, Any, Dict, List
 import tempfile
 from io import BytesIO, StringIO
 from sqlite3 import Binary as sBinary
-from collections import OrderedDict, MutableMapping
+from collections import namedtuple
+from collections.abc import MutableMapping
+from contextlib import contextmanager
 
 try:
     import geomet
@@ -19,13 +23,16 @@ except ImportError:
     _HASGEOMET = False
 
 from ._gpkg import _create_feature_class, _create_gpkg, _create_table, _insert_values
-from ._wkb import loads, dumps
+from ._gpkg import _init_gpkg, _init_gpkg_from_template, _transaction
+from ._gpkg import _field_ddl, _quote
+from ._rtree import _register_functions
+from ._wkb import loads, dumps, geojson_to_wkb, wkt_to_wkb, _HASSHAPELY
+from ._wkb import esrijson_to_wkb
+from ._wkb import NULL_WKB, ENVELOPE_SIZES
 
 # ----------------------------------------------------------------------
 def _handle_wkb(wkb):
-    """handles the insert convertion for the custom geometry types"""
-    if isinstance(wkb, bytes):
-        wkb = bytearray(wkb)
+    """handles the read convertion for the custom geometry types"""
     return wkb
 
 
@@ -35,65 +42,285 @@ def _adapt_wkb(wkb):
     return wkb
 
 
+_REGISTERED = False
+# ----------------------------------------------------------------------
+def _register_adapters_once():
+    """
+    registers the custom geometry dtypes.  The sqlite3 registries are
+    process wide, so this only needs to happen a single time.
+    """
+    global _REGISTERED
+    if _REGISTERED:
+        return
+    sqlite3.register_adapter(bytearray, _adapt_wkb)
+    for g in [
+        "POINT",
+        "LINESTRING",
+        "POLYGON",
+        "MULTIPOINT",
+        "MULTILINESTRING",
+        "MULTIPOLYGON",
+    ]:
+        sqlite3.register_converter(g, _handle_wkb)
+    _REGISTERED = True
+
+
+_register_adapters_once()
+# ----------------------------------------------------------------------
+def _apply_pragmas(
+    con,
+    path,
+    cache_size=-65536,
+    mmap_size=268435456,
+    synchronous="NORMAL",
+    wal=False,
+):
+    """
+    tunes the sync and cache settings of a new connection.  The journal
+    mode is stored in the file, so it is only switched to WAL on request.
+    """
+    if str(synchronous).upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        raise ValueError("Invalid synchronous setting: {s}".format(s=synchronous))
+    if wal and path != ":memory:":
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            # read-only files keep their journal mode
+            pass
+    pragmas = [
+        "PRAGMA synchronous={s};".format(s=str(synchronous).upper()),
+        "PRAGMA temp_store=MEMORY;",
+        "PRAGMA cache_size={cs};".format(cs=int(cache_size)),
+        "PRAGMA mmap_size={ms};".format(ms=int(mmap_size)),
+    ]
+    con.executescript("\n".join(pragmas))
+    return con
+
+
+# ----------------------------------------------------------------------
+# SQLite table names are case-insensitive and so are the lookups by name
+_EXISTS_SQL = "SELECT 1 FROM gpkg_contents WHERE table_name = ? COLLATE NOCASE LIMIT 1"
+_TABLES_SQL = """SELECT c.table_name, c.data_type, g.geometry_type_name, g.srs_id
+                  FROM gpkg_contents c LEFT JOIN gpkg_geometry_columns g
+                  ON g.table_name = c.table_name"""
+_GET_SQL = _TABLES_SQL + " WHERE c.table_name = ? COLLATE NOCASE LIMIT 1"
+_GP_HDR = struct.Struct("<2sBBi")
+# ----------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def _gp_header(srid, version=0, flags=1):
+    """
+    builds the 8 byte GeoPackage binary header (magic, version, flags and
+    srs_id) for an envelope-less, little endian geometry
+    """
+    return _GP_HDR.pack(b"GP", version, flags, int(srid))
+
+
+# ----------------------------------------------------------------------
+def _strip_gp_headers(blobs):
+    """removes the GeoPackage binary headers from a list of geometries"""
+    wkbs = []
+    for blob in blobs:
+        if blob is None or blob[:2] != b"GP":
+            wkbs.append(blob)
+        else:
+            wkbs.append(bytes(blob[8 + ENVELOPE_SIZES[(blob[3] >> 1) & 0x07] :]))
+    return wkbs
+
+
+# ----------------------------------------------------------------------
+def _update_sql(table, columns):
+    """builds a parameterized UPDATE statement for a row's columns"""
+    return """UPDATE {table} SET {values} WHERE OBJECTID=?""".format(
+        table=_quote(table), values=",".join(["%s=?" % _quote(c) for c in columns])
+    )
+
+
+# ----------------------------------------------------------------------
+def _split_where(where):
+    """splits a where argument into its clause and bound parameters"""
+    if isinstance(where, (tuple, list)):
+        clause, params = where
+        return clause, tuple(params)
+    return where, ()
+
+
+# ----------------------------------------------------------------------
+def _insert_sql(table, columns, count=1):
+    """builds an INSERT statement that writes `count` rows at once"""
+    q = "(" + ",".join(["?"] * len(columns)) + ")"
+    return """INSERT INTO {table} ({fields}) VALUES {q}""".format(
+        table=_quote(table),
+        fields=",".join(map(_quote, columns)),
+        q=",".join([q] * count),
+    )
+
+
+#: ids of the connections with an open edit session.  The session belongs to
+#: the connection, so every Table sharing it skips its own commits.
+_SESSIONS = set()
+#: rows written by each multi-row INSERT, capped so the bound parameters stay
+#: under SQLite's historic 999 variable limit
+_INSERT_ROWS = 64
+_MAX_VARIABLES = 999
+_InsertPlan = namedtuple("_InsertPlan", "key_set count shape")
+# ----------------------------------------------------------------------
+def _to_list(values):
+    """converts a column of values to a list of Python objects"""
+    if hasattr(values, "to_pylist"):
+        return values.to_pylist()
+    elif hasattr(values, "tolist"):
+        return values.tolist()
+    return list(values)
+
+
+# ----------------------------------------------------------------------
+def _arrow_batches(table, batch_size=10000):
+    """yields the record batches of a pyarrow Table as {name: column} dicts"""
+    if hasattr(table, "to_batches"):
+        batches = table.to_batches(max_chunksize=batch_size)
+    else:
+        batches = [table]
+    for batch in batches:
+        yield {name: batch.column(i) for i, name in enumerate(batch.schema.names)}
+
+
 ########################################################################
 class GeoPackage(object):
     """
     A single instance of a GeoPackage file.
+
+    New files are created in WAL mode, `synchronous=NORMAL` by default, so
+    recent writes may live in the `-wal` file beside it until the GeoPackage
+    is closed.  Call `checkpoint` before copying or sharing an open file.
+    Existing files keep their journal mode unless `wal=True` is given.
     """
 
     _con = None
     _dir = None
     _path = None
     _db_name = None
+    _cache_size = -65536
+    _mmap_size = 268435456
+    _synchronous = "NORMAL"
+    _wal = False
+    _schema_cache = None
+    use_shapely = False
 
     # ----------------------------------------------------------------------
-    def __init__(self, path, overwrite=False):
-        """Constructor"""
+    def __init__(
+        self,
+        path,
+        overwrite=False,
+        cache_size=-65536,
+        mmap_size=268435456,
+        use_shapely=False,
+        page_size=None,
+        synchronous="NORMAL",
+        wal=False,
+    ):
+        """
+        Constructor
 
-        self._dir = os.path.dirname(path)
-        self._db_name = os.path.basename(path)
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        path                Required String. The path to the geopackage.
+                            Use `:memory:` for a temporary geopackage that
+                            lives in memory until it is closed.
+        ---------------     -----------------------------------------------
+        overwrite           Optional Boolean. If True, an existing file is
+                            erased and a new geopackage is created.
+        ---------------     -----------------------------------------------
+        cache_size          Optional Integer. The SQLite page cache size.
+                            Negative values are in KiB, so the default of
+                            -65536 is 64 MB. Raise this for large inserts.
+        ---------------     -----------------------------------------------
+        mmap_size           Optional Integer. The number of bytes of the
+                            file SQLite may memory map. The default is 256 MB.
+        ---------------     -----------------------------------------------
+        use_shapely         Optional Boolean. If True and shapely 2.0+ is
+                            installed, GeoJSON and WKT geometries are
+                            converted to WKB by shapely instead of geomet.
+                            shapely is always used when geomet is missing.
+                            Applies to tables returned after it is set.
+        ---------------     -----------------------------------------------
+        page_size           Optional Integer. The SQLite page size in bytes
+                            for a new geopackage, ie: 65536. Larger pages
+                            speed up scans of big tables. It is ignored for
+                            an existing file.
+        ---------------     -----------------------------------------------
+        synchronous         Optional String. The SQLite synchronous mode:
+                            OFF, NORMAL (default), FULL or EXTRA. OFF is
+                            fastest but a power loss can corrupt the file.
+        ---------------     -----------------------------------------------
+        wal                 Optional Boolean. If True, an existing file is
+                            switched to WAL journaling, which lets readers
+                            work while a write is open.  New files always
+                            use WAL.  The mode is stored in the file and
+                            adds `-wal` and `-shm` files beside it.
+        ===============     ===============================================
 
-        if self._db_name.lower().endswith(".gpkg") == False:
-            self._db_name += ".gpkg"
-        self._path = os.path.join(self._dir, self._db_name)
-        if os.path.isfile(self._path) and overwrite:
-            os.remove(self._path)
-        self._path = _create_gpkg(
-            name=self._db_name, path=self._dir, overwrite=overwrite
+        """
+        self.use_shapely = use_shapely
+        self._cache_size = cache_size
+        self._mmap_size = mmap_size
+        self._synchronous = synchronous
+        self._wal = wal
+        self._schema_cache = {}
+
+        if path == ":memory:":
+            self._path = self._db_name = path
+            self._con = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+            if page_size:
+                _init_gpkg(self._con, page_size=page_size)
+            else:
+                _init_gpkg_from_template(self._con)
+        else:
+            self._dir = os.path.dirname(path)
+            self._db_name = os.path.basename(path)
+
+            if self._db_name.lower().endswith(".gpkg") == False:
+                self._db_name += ".gpkg"
+            self._path = os.path.join(self._dir, self._db_name)
+            if os.path.isfile(self._path) and overwrite:
+                os.remove(self._path)
+            self._path = _create_gpkg(
+                name=self._db_name,
+                path=self._dir,
+                overwrite=overwrite,
+                page_size=page_size,
+            )
+            self._con = sqlite3.connect(
+                self._path, detect_types=sqlite3.PARSE_DECLTYPES
+            )
+        _apply_pragmas(
+            self._con,
+            self._path,
+            self._cache_size,
+            self._mmap_size,
+            self._synchronous,
+            self._wal,
         )
-        self._con = sqlite3.connect(self._path, detect_types=sqlite3.PARSE_DECLTYPES)
-        # register custom dtypes
-        sqlite3.register_adapter(bytearray, _adapt_wkb)
-        for g in [
-            "POINT",
-            "LINESTRING",
-            "POLYGON",
-            "MULTIPOINT",
-            "MULTILINESTRING",
-            "MULTIPOLYGON",
-        ]:
-            sqlite3.register_converter(g, _handle_wkb)
+        _register_functions(self._con)
 
     # ----------------------------------------------------------------------
     def _setup(self):
-        """sets up the registration for the GeoPackage"""
+        """reopens the connection to the GeoPackage"""
         if self._path != ":memory:":
             self._con.close()
             self._con = None
             self._con = sqlite3.connect(
                 self._path, detect_types=sqlite3.PARSE_DECLTYPES
             )
-        # register custom dtypes
-        sqlite3.register_adapter(bytearray, _adapt_wkb)
-        for g in [
-            "POINT",
-            "LINESTRING",
-            "POLYGON",
-            "MULTIPOINT",
-            "MULTILINESTRING",
-            "MULTIPOLYGON",
-        ]:
-            sqlite3.register_converter(g, _handle_wkb)
+            _apply_pragmas(
+                self._con,
+                self._path,
+                self._cache_size,
+                self._mmap_size,
+                self._synchronous,
+                self._wal,
+            )
+            _register_functions(self._con)
 
     # ----------------------------------------------------------------------
     def __len__(self):
@@ -109,6 +336,15 @@ class GeoPackage(object):
     def __enter__(self) -> "GeoPackage":
         if self._con is None:
             self._con = sqlite3.connect(self._path)
+            _apply_pragmas(
+                self._con,
+                self._path,
+                self._cache_size,
+                self._mmap_size,
+                self._synchronous,
+                self._wal,
+            )
+            _register_functions(self._con)
         return self
 
     # ----------------------------------------------------------------------
@@ -116,6 +352,20 @@ class GeoPackage(object):
         self._con.commit()
         self._con.close()
 
+    # ----------------------------------------------------------------------
+    def checkpoint(self) -> bool:
+        """
+        Writes the pages held in the write-ahead log back to the GeoPackage
+        and truncates the `-wal` file, so the `.gpkg` can be copied or
+        shipped as a single file while it is still open.  Changes that are
+        not yet committed, such as an open edit session, are not included.
+
+        :returns: Boolean
+
+        """
+        busy, _, _ = self._con.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        return busy == 0
+
     # ----------------------------------------------------------------------
     def exists(self, name: str) -> bool:
         """
@@ -124,12 +374,8 @@ class GeoPackage(object):
         :returns: boolean
 
         """
-        sql = "SELECT table_name, data_type FROM gpkg_contents"
-        cur = self._con.execute(sql)
-        for tbl in cur:
-            if tbl[0].lower() == name.lower():
-                return True
-        return False
+        cur = self._con.execute(_EXISTS_SQL, (name,))
+        return cur.fetchone() is not None
 
     # ----------------------------------------------------------------------
     def get(self, name: str) -> Union["Table", "SpatialTable"]:
@@ -146,30 +392,36 @@ class GeoPackage(object):
         :returns: Table/SpatialTable
 
         """
-        sql = "SELECT table_name, data_type FROM gpkg_contents where table_name = ?"
-        cur = self._con.execute(sql, [name])
-        for tbl in cur:
-            if tbl[1] == "attributes":
-                return Table(tbl[0], self._con)
-            else:
-                return SpatialTable(tbl[0], self._con)
+        tbl = self._con.execute(_GET_SQL, [name]).fetchone()
+        if tbl is None:
+            return None
+        return self._make_table(tbl)
+
+    # ----------------------------------------------------------------------
+    def _make_table(self, tbl):
+        """builds a Table/SpatialTable from a `_TABLES_SQL` row"""
+        if tbl[1] == "attributes":
+            return Table(tbl[0], self._con, self.use_shapely, self._schema_cache)
+        return SpatialTable(
+            tbl[0],
+            self._con,
+            self.use_shapely,
+            self._schema_cache,
+            gtype=tbl[2],
+            wkid=tbl[3],
+        )
 
     # ----------------------------------------------------------------------
     @property
-    def tables(self) -> Generator["Table", "SpatialTable"]:
+    def tables(self) -> Iterator[Union["Table", "SpatialTable"]]:
         """
         Gets a list of registered table names with the geopackage
 
         :returns: iterator
 
         """
-        sql = "SELECT table_name, data_type FROM gpkg_contents"
-        cur = self._con.execute(sql)
-        for tbl in cur:
-            if tbl[1] == "attributes":
-                yield Table(tbl[0], self._con)
-            else:
-                yield SpatialTable(tbl[0], self._con)
+        for tbl in self._con.execute(_TABLES_SQL):
+            yield self._make_table(tbl)
 
     # ----------------------------------------------------------------------
     def enable(self) -> bool:
@@ -234,17 +486,15 @@ class GeoPackage(object):
         :returns: Table/SpatialTable
         """
         if overwrite:
-            sql_drop = """DROP TABLE IF EXISTS %s""" % name
-            sql_delete_row = """DELETE FROM gpkg_contents where table_name = '{tbl}'""".format(
-                tbl=name
-            )
-            sql_geom_col = """DELETE FROM gpkg_geometry_columns where table_name = '{tbl}'""".format(
-                tbl=name
-            )
-            self._con.execute(sql_drop)
-            self._con.execute(sql_delete_row)
-            self._con.execute(sql_geom_col)
-            self._con.commit()
+            sql_drop = """DROP TABLE IF EXISTS %s""" % _quote(name)
+            with _transaction(self._con, self._schema_cache):
+                self._con.execute(
+                    "DELETE FROM gpkg_contents where table_name = ?", [name]
+                )
+                self._con.execute(
+                    "DELETE FROM gpkg_geometry_columns where table_name = ?", [name]
+                )
+                self._con.execute(sql_drop)
         elif self.exists(name) and overwrite == False:
             raise ValueError(
                 "Table %s exists. Please pick a different table name" % name
@@ -258,36 +508,101 @@ class GeoPackage(object):
                 geometry=geometry_type,
             )
             if iftrue:
-                return SpatialTable(table=name, con=self._con)
+                return SpatialTable(
+                    table=name,
+                    con=self._con,
+                    use_shapely=self.use_shapely,
+                    schema_cache=self._schema_cache,
+                )
 
         else:
             iftrue = _create_table(con=self._con, name=name, fields=fields)
             if iftrue:
-                return Table(table=name, con=self._con)
+                return Table(
+                    table=name,
+                    con=self._con,
+                    use_shapely=self.use_shapely,
+                    schema_cache=self._schema_cache,
+                )
 
         return
 
+    # ----------------------------------------------------------------------
+    def create_many(
+        self, specs: List[Dict[str, Any]]
+    ) -> List[Union["Table", "SpatialTable"]]:
+        """
+        Creates several tables and feature classes in a single transaction.
+        If any of them fails, none of them are created.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        specs               Required List. A list of dictionaries holding
+                            the `create` parameters for each table, ie:
+                            `[{"name": "Toto"}, {"name": "Asia",
+                            "wkid": 4326, "geometry_type": "point"}]`
+        ===============     ===============================================
+
+        :returns: List of Table/SpatialTable
+        """
+        tables = []
+        with _transaction(self._con, self._schema_cache):
+            for spec in specs:
+                table = self.create(**spec)
+                if table is None:
+                    raise ValueError(
+                        "Could not create the table: %s" % spec.get("name")
+                    )
+                tables.append(table)
+        return tables
+
 
 ########################################################################
-class _Row(MutableMapping, OrderedDict):
+class _Row(MutableMapping):
     """
     A Single Row Entry. This class is created by the `Table` class.
 
     ** It should not be created by a user. **
     """
 
-    _con = None
-    _values = None
-    _table_name = None
-    _dict = None
-    _keys = None
+    __slots__ = (
+        "_row",
+        "_index",
+        "_con",
+        "_table_name",
+        "_header",
+        "_table",
+        "_dirty",
+        "_columns",
+    )
     # ----------------------------------------------------------------------
-    def __init__(self, values, table_name=None, con=None, header=None):
-        """Constructor"""
+    def __init__(
+        self,
+        values,
+        table_name=None,
+        con=None,
+        header=None,
+        table=None,
+        columns=None,
+        index=None,
+    ):
+        """
+        Constructor.  `values` is either a dictionary or the row tuple from
+        the cursor.  Rows from the same cursor share the `columns` tuple and
+        the `index` that maps each column name to its position.
+        """
+        if isinstance(values, dict):
+            columns = tuple(values)
+            values = tuple(values.values())
+        self._index = {c: i for i, c in enumerate(columns)} if index is None else index
+        self._columns = columns
+        self._row = values
         self._table_name = table_name
         self._con = con
-        self._values = values
         self._header = header
+        self._table = table
+        self._dirty = {}
 
     # ----------------------------------------------------------------------
     def __str__(self):
@@ -299,24 +614,30 @@ class _Row(MutableMapping, OrderedDict):
 
     # ----------------------------------------------------------------------
     def __setattr__(self, name, value):
-        if name in {"_values", "_dict", "_table_name", "_con", "_keys", "_header"}:
+        if name in _Row.__slots__:
             super().__setattr__(name, value)
-        elif name.lower() == "shape":
-            self._values[name] = value
-            self._update()
-        elif name.lower() != "objectid" and name in self.keys():
-            self._values[name] = value
-            self._update()
-
         elif name.lower() == "objectid":
             raise ValueError("OBJECTID values cannot be updated.")
         else:
-            raise ValueError("The field: {field} does not exist.".format(field=name))
+            if name not in self._index and name.lower() == "shape":
+                name = next((c for c in self._columns if c.lower() == "shape"), name)
+            if name not in self._index:
+                raise ValueError(
+                    "The field: {field} does not exist.".format(field=name)
+                )
+            if type(self._row) is not list:
+                self._row = list(self._row)
+            self._row[self._index[name]] = value
+            self._dirty[name] = True
+            self._update()
 
     # ----------------------------------------------------------------------
     def __getattr__(self, name):
-        if name in self._values:
-            return self._values[name]
+        if name in _Row.__slots__:
+            raise AttributeError(name)
+        i = self._index.get(name)
+        if i is not None:
+            return self._row[i]
         return
 
     # ----------------------------------------------------------------------
@@ -327,10 +648,22 @@ class _Row(MutableMapping, OrderedDict):
     def __setitem__(self, name, value):
         self.__setattr__(name, value)
 
+    # ----------------------------------------------------------------------
+    def __delitem__(self, name):
+        raise ValueError("Fields cannot be removed from a row.")
+
+    # ----------------------------------------------------------------------
+    def __iter__(self):
+        return iter(self._columns)
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        return len(self._columns)
+
     # ----------------------------------------------------------------------
     def keys(self):
         """returns the column names in the dataset"""
-        return list(self._values.keys())
+        return list(self._columns)
 
     # ----------------------------------------------------------------------
     @property
@@ -341,37 +674,36 @@ class _Row(MutableMapping, OrderedDict):
     # ----------------------------------------------------------------------
     def as_dict(self):
         """returns the row as a dictionary"""
-        return dict(zip(self.keys(), self.values()))
+        return dict(zip(self._columns, self._row))
 
     # ----------------------------------------------------------------------
     def values(self):
         """returns the row values"""
-        return list(self._values.values())
+        return list(self._row)
 
     # ----------------------------------------------------------------------
     def _update(self):
-        """updates the current row"""
-        txts = []
+        """writes the modified columns of the current row"""
+        columns = tuple(k for k in self._dirty if k.lower() != "objectid")
         values = []
-        for k, v in self._values.items():
-            if k.lower() != "objectid" and k.lower() != "shape":
-                txts.append("%s=?" % k)
-                values.append(v)
-            elif k.lower() == "shape":
-                if isinstance(v, dict) and "coordinates" not in v:
+        for k in columns:
+            v = self._row[self._index[k]]
+            if k.lower() == "shape":
+                if isinstance(v, (bytes, bytearray)):
+                    if isinstance(v, (bytearray)):
+                        v = bytes(v)
+                    if len(v) > 2 and v[:2] != b"GP":
+                        v = self._header + v
+                elif isinstance(v, dict) and "coordinates" not in v:
                     v = self._header + dumps(v, False)
                 elif isinstance(v, dict) and "coordinates" in v:
-                    v = self._gpheader + geometwkb.dumps(obj=v)
+                    v = self._header + geojson_to_wkb(v, self._use_shapely)
+                elif isinstance(v, str) and v[:2] in ("00", "01"):
+                    v = self._header + bytes.fromhex(v)
                 elif isinstance(v, str):
-                    gj = geometwkt.loads(v)
-                    v = self._gpheader + geometwkb.dumps(obj=gj)
-                elif isinstance(v, (bytes, bytearray)):
-                    if isinstance(v, (bytearray)):
-                        v = bytes(v)
-                    if len(v) > 2 and v[:2] != b"GB":
-                        v = self._gpheader + v
+                    v = self._header + wkt_to_wkb(v, self._use_shapely)
                 elif v is None:
-                    v = self._gpheader + b"0x000000000000f87f"
+                    v = self._header + NULL_WKB
                 else:
                     raise ValueError(
                         (
@@ -379,15 +711,16 @@ class _Row(MutableMapping, OrderedDict):
                             "WKT, GeoJSON dictionary, or WKB (bytes)"
                         )
                     )
-                txts.append("%s=?" % k)
-                values.append(v)
-        sql = """UPDATE {table} SET {values} WHERE OBJECTID={oid}""".format(
-            table=self._table_name, values=",".join(txts), oid=self._values["OBJECTID"]
-        )
-        cur = self._con.execute(sql, values)
-        self._con.commit()
-        del sql
-        del values, txts
+            values.append(v)
+        if columns:
+            if self._table is not None:
+                sql = self._table._update_sql_for(columns)
+            else:
+                sql = _update_sql(self._table_name, columns)
+            values.append(self["OBJECTID"])
+            self._con.execute(sql, values)
+            self._commit()
+        self._dirty.clear()
         return True
 
     # ----------------------------------------------------------------------
@@ -399,13 +732,28 @@ class _Row(MutableMapping, OrderedDict):
         """
         try:
             cur = self._con.execute(
-                """DELETE FROM {tbl} WHERE OBJECTID=?""".format(tbl=self._table_name),
+                """DELETE FROM {tbl} WHERE OBJECTID=?""".format(
+                    tbl=_quote(self._table_name)
+                ),
                 [self["OBJECTID"]],
             )
+            self._commit()
             return True
         except:
             return False
 
+    # ----------------------------------------------------------------------
+    @property
+    def _use_shapely(self):
+        """True when the owning table converts geometries with shapely"""
+        return self._table is not None and self._table._use_shapely
+
+    # ----------------------------------------------------------------------
+    def _commit(self):
+        """commits the change unless the table has an open edit session"""
+        if self._table is None or not self._table._in_session:
+            self._con.commit()
+
 
 ########################################################################
 class Table(object):
@@ -428,12 +776,143 @@ class Table(object):
     _con = None
     _table_name = None
     _create_sql = None
-    _fields = None
+    _schema_cache = None
+    _select_cache = None
+    _insert_cache = None
+    _insert_plans = None
+    _update_cache = None
+    _gp_header = None
+    _use_shapely = False
+    _arraysize = 1000
     # ----------------------------------------------------------------------
-    def __init__(self, table, con):
+    def __init__(self, table, con, use_shapely=False, schema_cache=None):
         """Constructor"""
         self._con = con
         self._table_name = table
+        self._update_cache = {}
+        self._select_cache = {}
+        self._insert_cache = {}
+        self._insert_plans = {}
+        self._use_shapely = use_shapely
+        self._schema_cache = {} if schema_cache is None else schema_cache
+
+    # ----------------------------------------------------------------------
+    @property
+    def _in_session(self):
+        """True while an edit session is open on the table's connection"""
+        return id(self._con) in _SESSIONS
+
+    # ----------------------------------------------------------------------
+    @contextmanager
+    def edit_session(self):
+        """
+        Groups row updates, deletes and inserts into a single transaction.
+        Changes are committed when the block exits and rolled back if an
+        exception is raised.  The session covers every table and `create`
+        call on the same GeoPackage, and a nested session joins the open one.
+
+        A rollback also undoes schema changes: cached fields are dropped, and
+        any Table returned by `create` inside the rolled-back session no
+        longer exists in the GeoPackage and must not be used.
+
+        .. code-block:: python
+
+            with tbl.edit_session():
+                for row in tbl.rows():
+                    row["artist"] = row["artist"].upper()
+
+        """
+        if self._in_session:
+            yield self
+            return
+        if self._con.in_transaction:
+            raise RuntimeError(
+                "An edit session cannot start while a transaction is open."
+            )
+        self._con.execute("BEGIN IMMEDIATE")
+        _SESSIONS.add(id(self._con))
+        try:
+            yield self
+        except BaseException:
+            self._con.rollback()
+            self._schema_cache.clear()
+            raise
+        else:
+            self._con.commit()
+        finally:
+            _SESSIONS.discard(id(self._con))
+
+    # ----------------------------------------------------------------------
+    def _insert_sql_for(self, columns, count=1):
+        """returns the cached INSERT statement for a tuple of columns"""
+        sql = self._insert_cache.get((columns, count))
+        if sql is None:
+            sql = _insert_sql(self._table_name, columns, count)
+            self._insert_cache[(columns, count)] = sql
+        return sql
+
+    # ----------------------------------------------------------------------
+    def _update_sql_for(self, columns):
+        """returns the cached UPDATE statement for a tuple of columns"""
+        sql = self._update_cache.get(columns)
+        if sql is None:
+            sql = self._update_cache[columns] = _update_sql(self._table_name, columns)
+        return sql
+
+    # ----------------------------------------------------------------------
+    def _select_sql(self, where=None, fields="*", objectid=True):
+        """
+        returns the cached SELECT statement for a where clause and field
+        list.  The caller's field list is never modified.
+        """
+        if isinstance(fields, (list, tuple)):
+            fields = tuple(fields)
+        key = (where, fields, objectid)
+        sql = self._select_cache.get(key)
+        if sql is not None:
+            return sql
+        if isinstance(fields, tuple):
+            known = {f.lower() for f in self.fields}
+            for fld in fields:
+                if fld.lower() not in known:
+                    raise ValueError(
+                        "The field: {field} does not exist.".format(field=fld)
+                    )
+            if objectid and "objectid" not in {f.lower() for f in fields}:
+                fields = fields + ("OBJECTID",)
+            fields = ",".join(map(_quote, fields))
+        if where is None:
+            sql = """SELECT {fields} from {tbl} """.format(
+                tbl=_quote(self._table_name), fields=fields
+            )
+        else:
+            sql = """SELECT {fields} from {tbl} WHERE {where}""".format(
+                tbl=_quote(self._table_name), fields=fields, where=where
+            )
+        if len(self._select_cache) >= 128:
+            self._select_cache.clear()
+        self._select_cache[key] = sql
+        return sql
+
+    # ----------------------------------------------------------------------
+    @property
+    def arraysize(self):
+        """
+        Gets/Sets the number of records `rows` fetches from SQLite at a time.
+        The default is 1,000.
+        """
+        return self._arraysize
+
+    # ----------------------------------------------------------------------
+    @arraysize.setter
+    def arraysize(self, value):
+        """
+        Gets/Sets the number of records `rows` fetches from SQLite at a time.
+        The default is 1,000.
+        """
+        if int(value) < 1:
+            raise ValueError("arraysize must be greater than 0")
+        self._arraysize = int(value)
 
     # ----------------------------------------------------------------------
     @property
@@ -463,11 +942,14 @@ class Table(object):
         :returns: Dictionary
 
         """
-        if self._fields is None:
-            sql = """PRAGMA table_info({tbl});""".format(tbl=self._table_name)
+        version = self._con.execute("PRAGMA schema_version;").fetchone()[0]
+        cached = self._schema_cache.get(self._table_name)
+        if cached is None or cached[0] != version:
+            sql = """PRAGMA table_info({tbl});""".format(tbl=_quote(self._table_name))
             rows = self._con.execute(sql).fetchall()
-            self._fields = {row[1]: row[2] for row in rows}
-        return self._fields
+            cached = (version, {row[1]: row[2] for row in rows})
+            self._schema_cache[self._table_name] = cached
+        return cached[1]
 
     # ----------------------------------------------------------------------
     def add_field(self, name, data_type):
@@ -497,58 +979,12 @@ class Table(object):
         :returns: Boolean
 
         """
-        _field_lookup = {
-            "text": [
-                "TEXT",
-                "check((typeof({field}) = 'text' or typeof({field}) = 'null') and not length({field}) > {l})",
-            ],
-            "float": [
-                "DOUBLE",
-                """check(typeof({field}) = 'real' or typeof({field}) = 'null')""",
-            ],
-            "double": [
-                "DOUBLE",
-                "check(typeof({field}) = 'real' or typeof({field}) = 'null')",
-            ],
-            "short": [
-                "SMALLINT",
-                "check((typeof({field}) = 'integer' or typeof({field}) = 'null') and {field} >= -32768 and {field} <= 32767)",
-            ],
-            "long": [
-                "MEDIUMINT",
-                "check((typeof({field}) = 'integer' or typeof({field}) = 'null') and {field} >= -2147483648 and {field} <= 2147483647)",
-            ],
-            "integer": [
-                "MEDIUMINT",
-                "check((typeof({field}) = 'integer' or typeof({field}) = 'null') and {field} >= -2147483648 and {field} <= 2147483647)",
-            ],
-            "date": [
-                "DATETIME",
-                "check((typeof({field}) = 'text' or typeof({field}) = 'null') and strftime('%Y-%m-%dT%H:%M:%fZ',{field}))",
-            ],
-            "blob": [
-                "BLOB",
-                "check(typeof({field}) = 'blob' or typeof({field}) = 'null')",
-            ],
-            "guid": [
-                "TEXT(38)",
-                "check((typeof({field}) = 'text' or typeof({field}) = 'null') and not length({field}) > 38)",
-            ],
-        }
         try:
-            row = _field_lookup[data_type.lower()]
-            if row[0].lower() != "text":
-                fld = "{field} {dtype} {st}".format(
-                    field=name, dtype=row[0], st=row[1]
-                ).format(field=name)
-            else:
-                fld = "{field} {dtype}".format(field=name, dtype=row[0])
             sql = """ALTER TABLE {table} ADD COLUMN {dtype};""".format(
-                table=self._table_name, field=name, dtype=fld
+                table=_quote(self._table_name), dtype=_field_ddl(name, data_type)
             )
-            self._con.execute(sql)
-            self._con.commit()
-            self._fields = None
+            with _transaction(self._con, self._schema_cache):
+                self._con.execute(sql)
             return True
         except:
             return False
@@ -566,19 +1002,47 @@ class Table(object):
 
         :returns: boolean
         """
-        fields = ",".join([fld for fld in self.fields if fld.lower() != name.lower()])
-        sql = """
-        CREATE TABLE temp_bkup AS SELECT {fields} FROM {table};
-        DROP TABLE {table};
-        ALTER TABLE temp_bkup RENAME TO {table};
-        """.format(
-            table=self._table_name, fields=fields
+        table = _quote(self._table_name)
+        # the column list comes from the live schema, not the fields cache
+        rows = self._con.execute("PRAGMA table_info({tbl});".format(tbl=table))
+        fields = ",".join(
+            [_quote(row[1]) for row in rows if row[1].lower() != name.lower()]
         )
-        self._con.executescript(sql)
-        self._con.commit()
-        self._fields = None
+        # executescript would commit an open edit session, so the statements
+        # run one at a time inside the (possibly shared) transaction
+        with _transaction(self._con, self._schema_cache):
+            self._con.execute(
+                """CREATE TABLE temp_bkup AS SELECT {fields} FROM {table}""".format(
+                    table=table, fields=fields
+                )
+            )
+            self._con.execute("""DROP TABLE {table}""".format(table=table))
+            self._con.execute(
+                """ALTER TABLE temp_bkup RENAME TO {table}""".format(table=table)
+            )
         return True
 
+    # ----------------------------------------------------------------------
+    def count(self, where=None) -> int:
+        """
+        Returns the number of rows in the table without reading them
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        where               Optional String/Tuple. Optional Sql where clause.
+                            A tuple of (clause, parameters) binds the values
+                            instead of formatting them into the SQL.
+        ===============     ===============================================
+
+        :returns: int
+        """
+        where, params = _split_where(where)
+        sql = """SELECT COUNT(*) FROM {tbl}""".format(tbl=_quote(self._table_name))
+        if where:
+            sql += """ WHERE {where}""".format(where=where)
+        return self._con.execute(sql, params).fetchone()[0]
+
     # ----------------------------------------------------------------------
     def rows(self, where=None, fields="*"):
         """
@@ -587,72 +1051,313 @@ class Table(object):
         ===============     ===============================================
         **Arguements**      **Description**
         ---------------     -----------------------------------------------
-        where               Optional String. Optional Sql where clause.
+        where               Optional String/Tuple. Optional Sql where clause.
+                            A tuple of (clause, parameters) binds the values
+                            instead of formatting them into the SQL, ie:
+                            `("artist = ?", ["The Murmaids"])`.
         ---------------     -----------------------------------------------
         fields              Optional List. The default is all fields (*).
                             A list of fields can be provided to limit the
                             data that is returned.
         ===============     ===============================================
 
+        **Note**
+
+        Every row is an editable `_Row`. For read-only scans use
+        `rows_fast`, which avoids building a `_Row` per record.
+
         :returns: _Row object
         """
-        if isinstance(fields, (list, tuple)):
-            if "OBJECTID" not in fields:
-                fields.append("OBJECTID")
-            fields = ",".join(fields)
-        if where is None:
-            query = """SELECT {fields} from {tbl} """.format(
-                tbl=self._table_name, fields=fields
-            )
-        else:
-            query = """SELECT {fields} from {tbl} WHERE {where}""".format(
-                tbl=self._table_name, fields=fields, where=where
-            )
+        for batch in self.row_batches(where=where, fields=fields):
+            yield from batch
+
+    # ----------------------------------------------------------------------
+    def first(self, where=None, fields="*"):
+        """
+        Returns the first row matching the where clause.  The query is
+        limited to one row, so SQLite stops at the first match.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        where               Optional String/Tuple. Optional Sql where clause.
+                            A tuple of (clause, parameters) binds the values
+                            instead of formatting them into the SQL, ie:
+                            `("artist = ?", ["The Murmaids"])`.
+        ---------------     -----------------------------------------------
+        fields              Optional List. The default is all fields (*).
+                            A list of fields can be provided to limit the
+                            data that is returned.
+        ===============     ===============================================
+
+        :returns: _Row object or None
+        """
+        where, params = _split_where(where)
+        query = self._select_sql(where, fields) + " LIMIT 1"
+        c = self._con.execute(query, params)
+        row = c.fetchone()
+        if row is None:
+            return None
+        columns = tuple(d[0] for d in c.description)
+        return _Row(
+            values=row,
+            table_name=self._table_name,
+            con=self._con,
+            header=self._gp_header,
+            table=self,
+            columns=columns,
+            index={c: i for i, c in enumerate(columns)},
+        )
+
+    # ----------------------------------------------------------------------
+    def row_batches(self, where=None, fields="*", batch_size=None):
+        """
+        Search/update cursor that yields the rows in lists, one list per
+        fetch from SQLite.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        where               Optional String/Tuple. Optional Sql where clause.
+                            A tuple of (clause, parameters) binds the values
+                            instead of formatting them into the SQL, ie:
+                            `("artist = ?", ["The Murmaids"])`.
+        ---------------     -----------------------------------------------
+        fields              Optional List. The default is all fields (*).
+                            A list of fields can be provided to limit the
+                            data that is returned.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows in each
+                            list. The default is the table's `arraysize`.
+        ===============     ===============================================
+
+        :returns: list of _Row objects
+        """
+        where, params = _split_where(where)
+        query = self._select_sql(where, fields)
         cursor = self._con.cursor()
-        c = cursor.execute(query)
-        columns = [d[0] for d in c.description]
-        for row in c:
-            yield _Row(
-                values=dict(zip(columns, row)),
-                table_name=self._table_name,
-                con=self._con,
-            )
+        cursor.arraysize = batch_size or self._arraysize
+        c = cursor.execute(query, params)
+        columns = tuple(d[0] for d in c.description)
+        index = {c: i for i, c in enumerate(columns)}
+        header = self._gp_header
+        while True:
+            batch = c.fetchmany()
+            if not batch:
+                break
+            yield [
+                _Row(
+                    values=row,
+                    table_name=self._table_name,
+                    con=self._con,
+                    header=header,
+                    table=self,
+                    columns=columns,
+                    index=index,
+                )
+                for row in batch
+            ]
+
+    # ----------------------------------------------------------------------
+    def rows_fast(self, where=None, fields="*", arraysize=1000):
+        """
+        Read-only iterator that returns each record as a named tuple.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        where               Optional String/Tuple. Optional Sql where clause.
+                            A tuple of (clause, parameters) binds the values
+                            instead of formatting them into the SQL, ie:
+                            `("artist = ?", ["The Murmaids"])`.
+        ---------------     -----------------------------------------------
+        fields              Optional List. The default is all fields (*).
+                            A list of fields can be provided to limit the
+                            data that is returned.
+        ---------------     -----------------------------------------------
+        arraysize           Optional Integer. The number of records fetched
+                            from SQLite at a time. The default is 1,000.
+        ===============     ===============================================
+
+        :returns: namedtuple
+        """
+        where, params = _split_where(where)
+        query = self._select_sql(where, fields, objectid=False)
+        c = self._con.execute(query, params)
+        Record = namedtuple("Record", [d[0] for d in c.description], rename=True)
+        make = Record._make
+        while True:
+            batch = c.fetchmany(arraysize)
+            if not batch:
+                break
+            yield from map(make, batch)
 
     # ----------------------------------------------------------------------
-    def insert(self, row):
+    def insert(self, row, batch_size=10000):
         """
-        Inserts a new row via dictionary
+        Inserts new rows via dictionaries
 
         ===============     ===============================================
         **Arguements**      **Description**
         ---------------     -----------------------------------------------
-        row                 Required Dictionary.  Insert a new row via a
-                            dictionary. The key/value pair must match up to
-                            the field names in the table.
+        row                 Required Dictionary/List.  Insert a new row via a
+                            dictionary, or many rows via a list of
+                            dictionaries. The key/value pair must match up to
+                            the field names in the table and every row must
+                            provide the same fields.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows written per
+                            transaction. The default is 10,000.
         ==============      ===============================================
 
         :returns: Boolean
 
         """
-        values = None
-        if isinstance(row, dict):
-            keys = row.keys()
-            values = [list(row.values())]
-        elif isinstance(row, (list, tuple)):
-            keys = row[0].keys()
-            values = [list(r.values()) for r in row]
-        q = ["?"] * len(keys)
-        q = ",".join(q)
-        sql = """INSERT INTO {table} ({fields})
-                     VALUES({q})""".format(
-            table=self._table_name, fields=",".join(keys), q=q
-        )
-        inserts = []
+        if isinstance(row, (dict, _Row)):
+            row = [row]
+        rows = [r.as_dict() if isinstance(r, _Row) else r for r in row]
+        if len(rows) == 0:
+            return True
+        keys = tuple(rows[0].keys())
+        key_set, count, _ = self._insert_plan(keys)
+        for r in rows:
+            if r.keys() != key_set:
+                raise ValueError("All rows must contain the same fields.")
         cur = self._con.cursor()
-        cur.execute(sql, list(values[0]))
-        self._con.commit()
+        for i in range(0, len(rows), batch_size):
+            batch = [[r[k] for k in keys] for r in rows[i : i + batch_size]]
+            self._write_batch(cur, keys, batch, count)
         return True
 
+    # ----------------------------------------------------------------------
+    def insert_many(self, rows, batch_size=10000):
+        """
+        Inserts a list of rows in bulk.  Each batch is written with
+        `executemany` inside a single transaction.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        rows                Required List. The rows to insert as
+                            dictionaries. The key/value pair must match up to
+                            the field names in the table and every row must
+                            provide the same fields.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows written per
+                            transaction. The default is 10,000.
+        ==============      ===============================================
+
+        :returns: Boolean
+
+        """
+        return self.insert(list(rows), batch_size=batch_size)
+
+    # ----------------------------------------------------------------------
+    def insert_columns(self, columns, batch_size=10000):
+        """
+        Inserts rows from columnar data without building a dictionary per
+        row.  The values of each column are zipped into row tuples one batch
+        at a time.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        columns             Required Dictionary. The field names and their
+                            values as lists, NumPy arrays, Pandas' Series or
+                            pyarrow arrays. Every column must be the same
+                            length.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows written per
+                            transaction. The default is 10,000.
+        ==============      ===============================================
+
+        :returns: Boolean
+
+        """
+        keys = tuple(columns.keys())
+        if len(keys) == 0:
+            return True
+        values = [_to_list(columns[k]) for k in keys]
+        total = len(values[0])
+        if any(len(v) != total for v in values):
+            raise ValueError("All columns must be the same length.")
+        count = self._insert_plan(keys).count
+        cur = self._con.cursor()
+        for i in range(0, total, batch_size):
+            batch = list(zip(*[v[i : i + batch_size] for v in values]))
+            self._write_batch(cur, keys, batch, count)
+        return True
+
+    # ----------------------------------------------------------------------
+    def insert_arrow(self, table, batch_size=10000):
+        """
+        Inserts the rows of a pyarrow Table or RecordBatch.  Each record
+        batch is converted column by column and written with
+        `insert_columns`.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        table               Required pyarrow.Table/RecordBatch. The column
+                            names must match up to the field names in the
+                            table.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows written per
+                            transaction. The default is 10,000.
+        ==============      ===============================================
+
+        :returns: Boolean
+
+        """
+        for batch in _arrow_batches(table, batch_size):
+            self.insert_columns(batch, batch_size=batch_size)
+        return True
+
+    # ----------------------------------------------------------------------
+    def _write_batch(self, cur, keys, batch, count):
+        """writes a batch in its own transaction unless a session is open"""
+        if self._in_session:
+            self._insert_batch(cur, keys, batch, count)
+        else:
+            with self._con:
+                self._insert_batch(cur, keys, batch, count)
+
+    # ----------------------------------------------------------------------
+    def _insert_plan(self, keys):
+        """
+        returns the cached key set, rows per statement and shape column for
+        a tuple of insert columns
+        """
+        plan = self._insert_plans.get(keys)
+        if plan is None:
+            shape = [k for k in keys if k.lower() == "shape"]
+            plan = self._insert_plans[keys] = _InsertPlan(
+                frozenset(keys),
+                max(1, min(_INSERT_ROWS, _MAX_VARIABLES // max(len(keys), 1))),
+                shape[0] if shape else None,
+            )
+        return plan
+
+    # ----------------------------------------------------------------------
+    def _insert_batch(self, cur, keys, batch, count):
+        """
+        writes the batch `count` rows per statement, then the remaining
+        rows one at a time
+        """
+        full = len(batch) - len(batch) % count
+        if count > 1 and full:
+            cur.executemany(
+                self._insert_sql_for(keys, count),
+                [
+                    [v for r in batch[j : j + count] for v in r]
+                    for j in range(0, full, count)
+                ],
+            )
+        else:
+            full = 0
+        if full < len(batch):
+            cur.executemany(self._insert_sql_for(keys), batch[full:])
+
     # ----------------------------------------------------------------------
     def to_pandas(self, where=None, fields="*", ftype=None):
         """
@@ -661,17 +1366,21 @@ class Table(object):
         ===============     ===============================================
         **Arguements**      **Description**
         ---------------     -----------------------------------------------
-        where               Optional String. Optional Sql where clause.
+        where               Optional String/Tuple. Optional Sql where clause.
+                            A tuple of (clause, parameters) binds the values
+                            instead of formatting them into the SQL, ie:
+                            `("artist = ?", ["The Murmaids"])`.
         ---------------     -----------------------------------------------
         fields              Optional List. The default is all fields (*).
                             A list of fields can be provided to limit the
                             data that is returned.
         ---------------     -----------------------------------------------
         ftype               Optional String. This value can be dataframe
-                            format type.  The value can be None or esri.
+                            format type.  The value can be None, esri or shapely.
 
                                 + None - means the dataframe will be a raw view of the table.
                                 + esri - means the dataframe will be a spatially enable dataframe. (Requires Python API for ArcGIS)
+                                + shapely - means the shape column holds shapely geometries. (Requires shapely 2.0+)
 
         ===============     ===============================================
 
@@ -680,32 +1389,34 @@ class Table(object):
         """
         import pandas as pd
 
-        if isinstance(fields, (list, tuple)):
-            if "OBJECTID" not in fields:
-                fields.append("OBJECTID")
-            fields = ",".join(fields)
-        if where is None:
-            query = """SELECT {fields} from {tbl} """.format(
-                tbl=self._table_name, fields=fields
-            )
-        else:
-            query = """SELECT {fields} from {tbl} WHERE {where}""".format(
-                tbl=self._table_name, fields=fields, where=where
-            )
+        where, params = _split_where(where)
+        query = self._select_sql(where, fields)
         if ftype is None:
-            return pd.read_sql_query(query, self._con)
+            return pd.read_sql_query(query, self._con, params=params)
+        elif str(ftype).lower() == "shapely":
+            try:
+                import shapely
+            except ImportError:
+                raise Exception(
+                    "shapely 2.0+ is required to import using ftype `shapely`"
+                )
+            df = pd.read_sql_query(query, self._con, params=params)
+            for SHAPE in [col for col in df.columns if str(col).lower() == "shape"]:
+                df[SHAPE] = shapely.from_wkb(_strip_gp_headers(df[SHAPE].tolist()))
+            return df
         elif str(ftype).lower() == "esri":
             try:
                 from arcgis.geometry import Geometry
                 from arcgis.features import GeoAccessor, GeoSeriesAccessor
 
-                df = pd.read_sql_query(query, self._con)
-                fields = list(self.fields.keys())
-                lower_fields = [str(fld).lower() for fld in fields]
-                if "shape" in lower_fields:
-                    idx = lower_fields.index("shape")
-                    SHAPE = fields[idx]
-                    df[SHAPE] = df[SHAPE].apply(lambda x: Geometry(x[8:]))
+                df = pd.read_sql_query(query, self._con, params=params)
+                shapes = [col for col in df.columns if str(col).lower() == "shape"]
+                if shapes:
+                    SHAPE = shapes[0]
+                    df[SHAPE] = [
+                        None if wkb is None else Geometry(wkb)
+                        for wkb in _strip_gp_headers(df[SHAPE].tolist())
+                    ]
                     df.spatial.set_geometry(SHAPE)
                     try:
                         df.spatial.project(self.wkid)
@@ -730,32 +1441,47 @@ class SpatialTable(Table):
     _con = None
     _wkid = None
     _gtype = None
-    _fields = None
     _table_name = None
     _create_sql = None
     _gp_header = None
+    _select_cache = None
+    _insert_cache = None
+    _insert_plans = None
+    _update_cache = None
     # ----------------------------------------------------------------------
-    def __init__(self, table, con):
+    def __init__(
+        self,
+        table,
+        con,
+        use_shapely=False,
+        schema_cache=None,
+        gtype=None,
+        wkid=None,
+    ):
         """Constructor"""
         self._table_name = table
         self._con = con
-        self._refresh()
+        self._update_cache = {}
+        self._select_cache = {}
+        self._insert_cache = {}
+        self._insert_plans = {}
+        self._use_shapely = use_shapely
+        self._schema_cache = {} if schema_cache is None else schema_cache
+        if gtype is None or wkid is None:
+            self._refresh()
+        else:
+            self._gtype, self._wkid = gtype, wkid
+            self._gp_header = _gp_header(self._wkid)
 
     # ----------------------------------------------------------------------
     def _refresh(self):
         """internal method that refreshes the table information"""
-        self._sd_lu = (
-            """SELECT * from gpkg_geometry_columns where table_name = '%s'"""
-            % self._table_name
-        )
-        cur = self._con.execute(self._sd_lu)
+        self._sd_lu = """SELECT geometry_type_name, srs_id from gpkg_geometry_columns where table_name = ? LIMIT 1"""
+        row = self._con.execute(self._sd_lu, [self._table_name]).fetchone()
         self._gp_header = None
-
-        for row in cur:
-            self._gtype = row[2]
-            self._wkid = row[3]
-            break
-        del cur
+        if row is not None:
+            self._gtype, self._wkid = row
+            self._gp_header = _gp_header(self._wkid)
 
     # ----------------------------------------------------------------------
     def __str__(self):
@@ -798,84 +1524,86 @@ class SpatialTable(Table):
         return self._wkid
 
     # ----------------------------------------------------------------------
-    def rows(self, where=None, fields="*"):
+    def _encode_shape(self, shape, geom_format="EsriJSON"):
+        """converts a supported geometry value to GeoPackage binary"""
+        if isinstance(shape, (bytes, bytearray)):
+            if isinstance(shape, (bytearray)):
+                shape = bytes(shape)
+            if len(shape) > 2 and shape[:2] != b"GP":
+                shape = self._gp_header + shape
+            return shape
+        elif isinstance(shape, dict) and geom_format.lower() == "esrijson":
+            return self._gp_header + dumps(shape, False)
+        elif isinstance(shape, dict) and geom_format.lower() == "geojson":
+            return self._gp_header + geojson_to_wkb(shape, self._use_shapely)
+        elif isinstance(shape, str) and shape[:2] in ("00", "01"):
+            return self._gp_header + bytes.fromhex(shape)
+        elif isinstance(shape, str) and geom_format.lower() == "wkt":
+            return self._gp_header + wkt_to_wkb(shape, self._use_shapely)
+        elif shape is None:
+            return self._gp_header + NULL_WKB
+        raise ValueError(
+            (
+                "Shape column must be Esri JSON dictionary, "
+                "WKT, GeoJSON dictionary, or WKB (bytes)"
+            )
+        )
+
+    # ----------------------------------------------------------------------
+    def insert(self, row, geom_format="EsriJSON", batch_size=10000):
         """
-        Search/update cursor like iterator
+        Inserts new rows via dictionaries
 
         ===============     ===============================================
         **Arguements**      **Description**
         ---------------     -----------------------------------------------
-        where               Optional String. Optional Sql where clause.
+        row                 Required Dictionary/List.  Insert a new row via a
+                            dictionary, or many rows via a list of
+                            dictionaries. The key/value pair must match up to
+                            the field names in the table and every row must
+                            provide the same fields.
         ---------------     -----------------------------------------------
-        fields              Optional List. The default is all fields (*).
-                            A list of fields can be provided to limit the
-                            data that is returned.
-        ===============     ===============================================
+        geom_format         Optional String. When providing geometries
+                            during insertion of new records, the method
+                            needs to know the format of the geometry. The
+                            formats supported values are: EsriJSON,
+                            GeoJSON, WKT, and WKB.
 
-        :returns: _Row object
-        """
-        if isinstance(fields, (list, tuple)):
-            if "OBJECTID" not in fields:
-                fields.append("OBJECTID")
-            fields = ",".join(fields)
-        if where is None:
-            query = """SELECT {fields} from {tbl} """.format(
-                tbl=self._table_name, fields=fields
-            )
-        else:
-            query = """SELECT {fields} from {tbl} WHERE {where}""".format(
-                tbl=self._table_name, fields=fields, where=where
-            )
-        cursor = self._con.cursor()
-        c = cursor.execute(query)
-        columns = [d[0] for d in c.description]
-        for row in c:
-            yield _Row(
-                values=dict(zip(columns, row)),
-                table_name=self._table_name,
-                con=self._con,
-                header=self._gpheader,
-            )
+                            The default geometry format is`EsriJSON`.
 
-    # ----------------------------------------------------------------------
-    def _flag_to_bytes(self, code):
-        """converts single integer to bytes"""
-        return int(code).to_bytes(1, byteorder="little")
+                            **Note**
 
-    # ----------------------------------------------------------------------
-    def _srid_to_bytes(self, srid):
-        """converst WKID values to bytes"""
-        return int(srid).to_bytes(4, byteorder="little")
+                            GeoJSON and WKT require the package `geomet` to
+                            be installed, or shapely 2.0+. shapely is used
+                            when geomet is missing or the GeoPackage was
+                            opened with `use_shapely=True`.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows written per
+                            transaction. The default is 10,000.
+        ==============      ===============================================
 
-    # ----------------------------------------------------------------------
-    def _build_gp_header(self, version=0, empty=1):
-        """assembles the GP header for WKB geometry"""
-        return (
-            b"GP"
-            + self._flag_to_bytes(version)
-            + self._flag_to_bytes(empty)
-            + self._srid_to_bytes(self.wkid)
-        )
+        :returns: Boolean
 
-    # ----------------------------------------------------------------------
-    @property
-    def _gpheader(self):
-        """internal only, builds the geopackage binary header"""
-        if self._gp_header is None:
-            self._gp_header = self._build_gp_header()
-        return self._gp_header
+        """
+        if isinstance(row, (dict, _Row)):
+            row = [row]
+        return self.insert_many(row, geom_format=geom_format, batch_size=batch_size)
 
     # ----------------------------------------------------------------------
-    def insert(self, row, geom_format="EsriJSON"):
+    def insert_many(self, rows, geom_format="EsriJSON", batch_size=10000):
         """
-        Inserts a new row via dictionary
+        Inserts a list of rows in bulk.  Every geometry is encoded first,
+        Esri JSON points with numpy and WKT and GeoJSON with shapely when
+        they are installed, and the rows are then written with
+        `executemany`.
 
         ===============     ===============================================
         **Arguements**      **Description**
         ---------------     -----------------------------------------------
-        row                 Required Dictionary.  Insert a new row via a
-                            dictionary. The key/value pair must match up to
-                            the field names in the table.
+        rows                Required List. The rows to insert as
+                            dictionaries. The key/value pair must match up to
+                            the field names in the table and every row must
+                            provide the same fields.
         ---------------     -----------------------------------------------
         geom_format         Optional String. When providing geometries
                             during insertion of new records, the method
@@ -888,68 +1616,124 @@ class SpatialTable(Table):
                             **Note**
 
                             GeoJSON and WKT require the package `geomet` to
-                            be installed.
+                            be installed, or shapely 2.0+. shapely is used
+                            when geomet is missing or the GeoPackage was
+                            opened with `use_shapely=True`.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows written per
+                            transaction. The default is 10,000.
+        ==============      ===============================================
+
+        :returns: Boolean
+
+        """
+        self._check_geom_format(geom_format)
+        rows = [r.as_dict() if isinstance(r, _Row) else dict(r) for r in rows]
+        if len(rows) == 0:
+            return True
+        shape = self._insert_plan(tuple(rows[0].keys())).shape
+        if shape:
+            shapes = [r[shape] for r in rows if shape in r]
+            if len(shapes) != len(rows):
+                raise ValueError("All rows must contain the same fields.")
+            for r, blob in zip(rows, self._encode_shapes(shapes, geom_format)):
+                r[shape] = blob
+        return super().insert(rows, batch_size=batch_size)
 
+    # ----------------------------------------------------------------------
+    def insert_columns(self, columns, geom_format="EsriJSON", batch_size=10000):
+        """
+        Inserts rows from columnar data without building a dictionary per
+        row.  The shape column is encoded in one vectorized call and the
+        values of each column are zipped into row tuples one batch at a time.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        columns             Required Dictionary. The field names and their
+                            values as lists, NumPy arrays, Pandas' Series or
+                            pyarrow arrays. Every column must be the same
+                            length.
+        ---------------     -----------------------------------------------
+        geom_format         Optional String. The format of the shape column.
+                            The formats supported values are: EsriJSON,
+                            GeoJSON, WKT, and WKB.
+
+                            The default geometry format is`EsriJSON`.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows written per
+                            transaction. The default is 10,000.
         ==============      ===============================================
 
         :returns: Boolean
 
         """
-        if _HASGEOMET == False and geom_format.lower() in ["wkt", "geojson"]:
+        self._check_geom_format(geom_format)
+        shape = self._insert_plan(tuple(columns.keys())).shape
+        if shape:
+            columns = dict(columns)
+            columns[shape] = self._encode_shapes(_to_list(columns[shape]), geom_format)
+        return super().insert_columns(columns, batch_size=batch_size)
+
+    # ----------------------------------------------------------------------
+    def insert_arrow(self, table, geom_format="WKB", batch_size=10000):
+        """
+        Inserts the rows of a pyarrow Table or RecordBatch.  Each record
+        batch is converted column by column and written with
+        `insert_columns`.
+
+        ===============     ===============================================
+        **Arguements**      **Description**
+        ---------------     -----------------------------------------------
+        table               Required pyarrow.Table/RecordBatch. The column
+                            names must match up to the field names in the
+                            table.
+        ---------------     -----------------------------------------------
+        geom_format         Optional String. The format of the shape column.
+                            The formats supported values are: EsriJSON,
+                            GeoJSON, WKT, and WKB.
+
+                            The default geometry format is`WKB`.
+        ---------------     -----------------------------------------------
+        batch_size          Optional Integer. The number of rows written per
+                            transaction. The default is 10,000.
+        ==============      ===============================================
+
+        :returns: Boolean
+
+        """
+        for batch in _arrow_batches(table, batch_size):
+            self.insert_columns(batch, geom_format=geom_format, batch_size=batch_size)
+        return True
+
+    # ----------------------------------------------------------------------
+    def _check_geom_format(self, geom_format):
+        """raises when WKT or GeoJSON is given without geomet or shapely"""
+        if (
+            _HASGEOMET == False
+            and _HASSHAPELY == False
+            and geom_format.lower() in ["wkt", "geojson"]
+        ):
             raise ValueError(
                 (
-                    "The package `geomet` is required to work with "
-                    "WKT and GeoJSON. Run `pip install geomet` to install."
+                    "The package `geomet` or `shapely` is required to work "
+                    "with WKT and GeoJSON. Run `pip install geomet` to install."
                 )
             )
-        if isinstance(row, _Row):
-            row = row._values
-        values = None
-        flds = {fld.lower(): fld for fld in row.keys()}
-        if "shape" in flds:
-            if (
-                isinstance(row[flds["shape"]], dict)
-                and geom_format.lower() == "esrijson"
-            ):
-                row[flds["shape"]] = self._gpheader + dumps(row[flds["shape"]], False)
-            elif (
-                isinstance(row[flds["shape"]], dict)
-                and geom_format.lower() == "geojson"
-            ):
-                row[flds["shape"]] = self._gpheader + geometwkb.dumps(
-                    obj=row[flds["shape"]]
-                )
-            elif isinstance(row[flds["shape"]], str) and geom_format.lower() == "wkt":
-                gj = geometwkt.loads(row[flds["shape"]])
-                row[flds["shape"]] = self._gpheader + geometwkb.dumps(obj=gj)
-            elif isinstance(row[flds["shape"]], (bytes, bytearray)):
-                if isinstance(row[flds["shape"]], (bytearray)):
-                    row[flds["shape"]] = bytes(row[flds["shape"]])
-                if len(row[flds["shape"]]) > 2 and row[flds["shape"]][:2] != b"GB":
-                    row[flds["shape"]] = self._gpheader + row[flds["shape"]]
-            elif row[flds["shape"]] is None:
-                row[flds["shape"]] = self._gpheader + b"0x000000000000f87f"
-            else:
-                raise ValueError(
-                    (
-                        "Shape column must be Esri JSON dictionary, "
-                        "WKT, GeoJSON dictionary, or WKB (bytes)"
-                    )
-                )
-        if isinstance(row, dict):
-            keys = row.keys()
-            values = [list(row.values())]
-        elif isinstance(row, (list, tuple)):
-            keys = row[0].keys()
-            values = [list(r.values()) for r in row]
-        q = ["?"] * len(keys)
-        q = ",".join(q)
-        sql = """INSERT INTO {table} ({fields})
-                     VALUES({q})""".format(
-            table=self._table_name, fields=",".join(keys), q=q
-        )
-        inserts = []
-        cur = self._con.cursor()
-        cur.execute(sql, list(values[0]))
-        self._con.commit()
-        return True
+
+    # ----------------------------------------------------------------------
+    def _encode_shapes(self, shapes, geom_format="EsriJSON"):
+        """converts a list of geometries to GeoPackage binary"""
+        fmt = geom_format.lower()
+        if fmt == "wkt" and all(
+            isinstance(g, str) and g[:2] not in ("00", "01") for g in shapes
+        ):
+            wkbs = wkt_to_wkb(shapes, self._use_shapely)
+        elif fmt == "geojson" and all(isinstance(g, dict) for g in shapes):
+            wkbs = geojson_to_wkb(shapes, self._use_shapely)
+        elif fmt == "esrijson" and all(isinstance(g, dict) for g in shapes):
+            wkbs = esrijson_to_wkb(shapes)
+        else:
+            return [self._encode_shape(g, geom_format) for g in shapes]
+        header = self._gp_header
+        return [header + wkb for wkb in wkbs]
@@ -5,40 +5,56 @@ import os
 import sys
 import sqlite3
 import tempfile
+from contextlib import contextmanager
+
+from ._coord import lookup_coordinate_system
 
 # --------------------------------------------------------------------------
+_INT_CHECK = "check((typeof({f}) = 'integer' or typeof({f}) = 'null') and {f} >= %s and {f} <= %s)"
+#: field type -> (column type, check constraint builder).  Each builder is the
+#: bound `format` of its template and takes the quoted field name as `f`.
 _field_lookup = {
-    "text": [
-        "TEXT",
-        "check((typeof({field}) = 'text' or typeof({field}) = 'null') and not length({field}) > {l})",
-    ],
-    "float": [
-        "DOUBLE",
-        """check(typeof({field}) = 'real' or typeof({field}) = 'null')""",
-    ],
-    "double": ["DOUBLE", "check(typeof({field}) = 'real' or typeof({field}) = 'null')"],
-    "short": [
-        "SMALLINT",
-        "check((typeof({field}) = 'integer' or typeof({field}) = 'null') and {field} >= -32768 and {field} <= 32767)",
-    ],
-    "long": [
-        "MEDIUMINT",
-        "check((typeof({field}) = 'integer' or typeof({field}) = 'null') and {field} >= -2147483648 and {field} <= 2147483647)",
-    ],
-    "integer": [
-        "MEDIUMINT",
-        "check((typeof({field}) = 'integer' or typeof({field}) = 'null') and {field} >= -2147483648 and {field} <= 2147483647)",
-    ],
-    "date": [
+    "text": ("TEXT", None),
+    "float": ("DOUBLE", "check(typeof({f}) = 'real' or typeof({f}) = 'null')".format),
+    "double": ("DOUBLE", "check(typeof({f}) = 'real' or typeof({f}) = 'null')".format),
+    "short": ("SMALLINT", (_INT_CHECK % (-32768, 32767)).format),
+    "long": ("MEDIUMINT", (_INT_CHECK % (-2147483648, 2147483647)).format),
+    "integer": ("MEDIUMINT", (_INT_CHECK % (-2147483648, 2147483647)).format),
+    "date": (
         "DATETIME",
-        "check((typeof({field}) = 'text' or typeof({field}) = 'null') and strftime('%Y-%m-%dT%H:%M:%fZ',{field}))",
-    ],
-    "blob": ["BLOB", "check(typeof({field}) = 'blob' or typeof({field}) = 'null')"],
-    "guid": [
+        "check((typeof({f}) = 'text' or typeof({f}) = 'null') and strftime('%Y-%m-%dT%H:%M:%fZ',{f}))".format,
+    ),
+    "blob": ("BLOB", "check(typeof({f}) = 'blob' or typeof({f}) = 'null')".format),
+    "guid": (
         "TEXT(38)",
-        "check((typeof({field}) = 'text' or typeof({field}) = 'null') and not length({field}) > 38)",
-    ],
+        "check((typeof({f}) = 'text' or typeof({f}) = 'null') and not length({f}) > 38)".format,
+    ),
 }
+
+
+# --------------------------------------------------------------------------
+def _quote(name):
+    """quotes an identifier so reserved words and spaces can be used"""
+    return '"%s"' % name.replace('"', '""')
+
+
+#: field type -> builder of the whole column definition, keyed by the lower
+#: and upper case type name so the common spellings skip `str.lower`.
+_FIELD_BUILDERS = {}
+for _key, (_dtype, _check) in _field_lookup.items():
+    _FIELD_BUILDERS[_key] = _FIELD_BUILDERS[_key.upper()] = (
+        "{f} %s" % _dtype if _check is None else "{f} %s %s" % (_dtype, _check(f="{f}"))
+    ).format
+del _key, _dtype, _check
+# --------------------------------------------------------------------------
+def _field_ddl(name, data_type):
+    """builds the column definition for a field name and field type"""
+    build = _FIELD_BUILDERS.get(data_type)
+    if build is None:
+        build = _FIELD_BUILDERS[data_type.lower()]
+    return build(f=_quote(name))
+
+
 # --------------------------------------------------------------------------
 _create_tables_sql = [
     """CREATE TABLE IF NOT EXISTS gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY,data_type TEXT NOT NULL,identifier TEXT UNIQUE,description TEXT DEFAULT '',last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),min_x DOUBLE,min_y DOUBLE,max_x DOUBLE,max_y DOUBLE,srs_id INTEGER,CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys (srs_id))""",
@@ -73,24 +89,67 @@ _initial_triggers_sql = [
     """CREATE TRIGGER IF NOT EXISTS 'gpkg_tile_matrix_zoom_level_insert' BEFORE INSERT ON 'gpkg_tile_matrix' FOR EACH ROW BEGIN SELECT RAISE(ABORT, 'insert on table ''gpkg_tile_matrix'' violates constraint: zoom_level cannot be less than 0') WHERE (NEW.zoom_level < 0);END""",
     """CREATE TRIGGER IF NOT EXISTS 'gpkg_tile_matrix_zoom_level_update' BEFORE UPDATE OF zoom_level ON 'gpkg_tile_matrix' FOR EACH ROW BEGIN SELECT RAISE(ABORT, 'update on table ''gpkg_tile_matrix'' violates constraint: zoom_level cannot be less than 0') WHERE (NEW.zoom_level < 0);END""",
 ]
+# the script leaves its transaction open so the seed rows join it and the
+# whole file is bootstrapped with a single commit
+_DDL_SCRIPT = "BEGIN;\n" + ";\n".join(_create_tables_sql + _initial_triggers_sql) + ";"
+_INITIALIZED_SQL = "SELECT 1 FROM sqlite_master WHERE name = 'gpkg_contents' LIMIT 1"
+# gpkg_extensions rows have a NULL table_name, which the UNIQUE constraint
+# does not catch, so the seed checks for the extension name itself.
+_SEED_EXTENSIONS_SQL = """INSERT INTO gpkg_extensions (extension_name, definition, scope)
+SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM gpkg_extensions WHERE extension_name = ?1)"""
+_DEFAULT_EXTENSIONS = [
+    ("gpkg_metadata", "F.8 Metadata", "read-write"),
+    ("gpkg_schema", "F.9 Schema", "read-write"),
+]
+_SEED_SRS_SQL = """INSERT OR IGNORE INTO gpkg_spatial_ref_sys
+(srs_name, srs_id, organization, organization_coordsys_id, definition, description)
+VALUES (?, ?, ?, ?, ?, ?)"""
+_DEFAULT_SRS = [
+    (
+        "GCS_WGS_1984",
+        4326,
+        "EPSG",
+        4326,
+        """GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]""",
+        "WGS 1984",
+    ),
+    ("Undefined Cartesian", -1, "NONE", -1, "undefined", None),
+    ("Undefined Geographic", 0, "NONE", 0, "undefined", None),
+]
+# ----------------------------------------------------------------------
+@contextmanager
+def _transaction(con, cache=None):
+    """
+    runs a block of statements, DDL included, as one transaction that is
+    committed once at the end or rolled back on error.  Inside an open
+    transaction the block joins it and the outer block commits.  A rollback
+    takes `PRAGMA schema_version` back down, so the optional schema `cache`
+    is cleared with it.
+    """
+    if con.in_transaction:
+        yield con
+        return
+    try:
+        with con:
+            con.execute("BEGIN")
+            yield con
+    except BaseException:
+        if cache is not None:
+            cache.clear()
+        raise
+
+
 # ----------------------------------------------------------------------
 def _insert_values(con, tbl, fields, values):
-    """inserts multiple values into a table"""
+    """inserts multiple values into a table, the caller commits"""
     q = ["?"] * len(fields)
     q = ",".join(q)
     sql = """INSERT INTO {table} ({fields})
                  VALUES({q})""".format(
         table=tbl, fields=",".join(fields), q=q
     )
-    inserts = []
-    cur = con.cursor()
-    for val in values:
-        if not isinstance(val, list):
-            val = [val]
-        cur.execute(sql, val)
-        inserts.append(cur.lastrowid)
-    con.commit()
-    return inserts
+    values = [val if isinstance(val, list) else [val] for val in values]
+    con.executemany(sql, values)
 
 
 # --------------------------------------------------------------------------
@@ -99,7 +158,7 @@ def _copy_table_schema(con, table_source, table_name_dest):
     from ._geopackage import SpatialTable, Table
 
     sql = """CREATE TABLE {dest} AS SELECT * FROM {source} WHERE 0""".format(
-        source=table_source, dest=table_name_dest
+        source=_quote(table_source), dest=_quote(table_name_dest)
     )
     # _insert_values(con=con, tbl="gpkg_contents",
     # fields=['table_name', 'data_type', 'identifier', 'srs_id'],
@@ -109,14 +168,14 @@ def _copy_table_schema(con, table_source, table_name_dest):
     # fields=['table_name', 'column_name', 'geometry_type_name', 'srs_id', 'z', 'm'],
     # values=[[name, 'Shape', _geom_lu[geometry.lower()], wkid, int(has_z),int(has_m)]])
     try:
-        con.execute(sql)
-        con.commit()
+        with con:
+            con.execute(sql)
     except Exception as e:
         raise Exception(e)
 
 
 # ----------------------------------------------------------------------
-def _create_gpkg(name, path=None, overwrite=False):
+def _create_gpkg(name, path=None, overwrite=False, page_size=None):
     """
     Creates an empty geopackage
     """
@@ -129,57 +188,59 @@ def _create_gpkg(name, path=None, overwrite=False):
     fp = os.path.join(path, name)
     if overwrite and os.path.isfile(fp):
         os.remove(fp)
+    exists = os.path.isfile(fp)
     con = sqlite3.connect(database=fp)
-
-    for sql in _create_tables_sql:
-        con.execute(sql)
-    for trg_sql in _initial_triggers_sql:
-        con.execute(trg_sql)
-    sql = """SELECT * from gpkg_extensions"""
-    cur = con.execute(sql)
-    result = cur.fetchall()
-    con.commit()
-    del cur
-    if len(result) < 2:
-        _insert_values(
-            con=con,
-            tbl="gpkg_extensions",
-            fields=["extension_name", "definition", "scope"],
-            values=[
-                ["gpkg_metadata", "F.8 Metadata", "read-write"],
-                ["gpkg_schema", "F.9 Schema", "read-write"],
-            ],
-        )
-        _insert_values(
-            con=con,
-            tbl="gpkg_spatial_ref_sys",
-            fields=[
-                "srs_name",
-                "srs_id",
-                "organization",
-                "organization_coordsys_id",
-                "definition",
-                "description",
-            ],
-            values=[
-                [
-                    "GCS_WGS_1984",
-                    4326,
-                    "EPSG",
-                    "4326",
-                    """GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]""",
-                    "WGS 1984",
-                ],
-                ["Undefined Cartesian", -1, "NONE", "-1", "undefined", None],
-                ["Undefined Geographic", 0, "NONE", "0", "undefined", None],
-            ],
-        )
-    con.commit()
+    if not exists:
+        # the page size is fixed once the file is in WAL mode, so set it
+        # first.  An existing file keeps its journal mode.
+        _set_page_size(con, page_size)
+        con.execute("PRAGMA journal_mode=WAL")
+    _init_gpkg(con)
     con.close()
     del con
     return fp
 
 
+# --------------------------------------------------------------------------
+def _set_page_size(con, page_size=None):
+    """sets the page size, which only applies before the first table exists"""
+    if page_size:
+        con.execute("PRAGMA page_size={ps};".format(ps=int(page_size)))
+    return con
+
+
+# --------------------------------------------------------------------------
+def _init_gpkg(con, page_size=None):
+    """
+    creates the GeoPackage tables, triggers and default rows on a
+    connection.  A file that already has them is left untouched, so
+    opening it needs no write and works on read-only files.
+    """
+    if con.execute(_INITIALIZED_SQL).fetchone() is not None:
+        return con
+    _set_page_size(con, page_size)
+    con.executescript(_DDL_SCRIPT)
+    with con:
+        con.executemany(_SEED_EXTENSIONS_SQL, _DEFAULT_EXTENSIONS)
+        con.executemany(_SEED_SRS_SQL, _DEFAULT_SRS)
+    return con
+
+
+_TEMPLATE = None
+# --------------------------------------------------------------------------
+def _init_gpkg_from_template(con):
+    """
+    copies an empty geopackage into a new in-memory connection.  The
+    template is built once per process, so later copies skip the DDL.
+    """
+    global _TEMPLATE
+    if _TEMPLATE is None:
+        template = sqlite3.connect(":memory:", check_same_thread=False)
+        _TEMPLATE = _init_gpkg(template)
+    _TEMPLATE.backup(con)
+    return con
+
+
 # --------------------------------------------------------------------------
 def _create_table(con, name, fields=None):
     """creates an attribute table"""
@@ -188,29 +249,19 @@ def _create_table(con, name, fields=None):
         fields = {}
 
     for k, v in fields.items():
-        row = _field_lookup[v.lower()]
-        if row[0].lower() != "text":
-            fld = "{field} {dtype} {st}".format(field=k, dtype=row[0], st=row[1])
-            txts.append(fld.format(field=k))
-        else:
-            fld = "{field} {dtype}".format(field=k, dtype=row[0])
-            txts.append(fld)
-        del k, v
-    try:
-        sql = """CREATE TABLE IF NOT EXISTS {tbl} ({fields})""".format(
-            tbl=name, fields=",".join(txts)
-        )
+        txts.append(_field_ddl(k, v))
+    sql = """CREATE TABLE IF NOT EXISTS {tbl} ({fields})""".format(
+        tbl=_quote(name), fields=",".join(txts)
+    )
+    with _transaction(con):
         con.execute(sql)
-        con.commit()
         _insert_values(
             con=con,
             tbl="gpkg_contents",
             fields=["table_name", "data_type", "identifier"],
             values=[[name, "attributes", name]],
         )
-        return True
-    except:
-        return False
+    return True
 
 
 # ----------------------------------------------------------------------
@@ -247,62 +298,60 @@ def _create_feature_class(
         fields = {}
 
     for k, v in fields.items():
-        row = _field_lookup[v.lower()]
-        if row[0].lower() != "text":
-            fld = "{field} {dtype} {st}".format(field=k, dtype=row[0], st=row[1])
-            txts.append(fld.format(field=k))
-        else:
-            fld = "{field} {dtype}".format(field=k, dtype=row[0])
-            txts.append(fld)
-        del k, v
+        txts.append(_field_ddl(k, v))
     sql = """CREATE TABLE IF NOT EXISTS {name} ({fields})""".format(
-        name=name, fields=",".join(txts)
-    )
-    try:
-        con.execute(sql)
-        con.commit()
-    except Exception as e:
-        raise Exception(e)
-
-    _insert_values(
-        con=con,
-        tbl="gpkg_contents",
-        fields=["table_name", "data_type", "identifier", "srs_id"],
-        values=[[name, "features", name, wkid]],
-    )
-
-    _insert_values(
-        con=con,
-        tbl="gpkg_geometry_columns",
-        fields=["table_name", "column_name", "geometry_type_name", "srs_id", "z", "m"],
-        values=[
-            [name, "Shape", _geom_lu[geometry.lower()], wkid, int(has_z), int(has_m)]
-        ],
+        name=_quote(name), fields=",".join(txts)
     )
+    with _transaction(con):
+        try:
+            con.execute(sql)
+        except Exception as e:
+            raise Exception(e)
 
-    sql = """select srs_id from gpkg_spatial_ref_sys where srs_id = {wkid};""".format(
-        wkid=wkid
-    )
-    sr_check = len(con.execute(sql).fetchall())
-    if sr_check == 0:
-        from ._coord import lookup_coordinate_system
+        _insert_values(
+            con=con,
+            tbl="gpkg_contents",
+            fields=["table_name", "data_type", "identifier", "srs_id"],
+            values=[[name, "features", name, wkid]],
+        )
 
-        res = lookup_coordinate_system(wkid=wkid)
-        if len(res) > 0:
-            res = res[0]
         _insert_values(
             con=con,
-            tbl="gpkg_spatial_ref_sys",
+            tbl="gpkg_geometry_columns",
             fields=[
-                "srs_name",
+                "table_name",
+                "column_name",
+                "geometry_type_name",
                 "srs_id",
-                "organization",
-                "description",
-                "organization_coordsys_id",
-                "definition",
+                "z",
+                "m",
             ],
             values=[
-                [res["NAME"], res["WKID"], "ESRI", res["NAME"], res["WKID"], res["WKT"]]
+                [
+                    name,
+                    "Shape",
+                    _geom_lu[geometry.lower()],
+                    wkid,
+                    int(has_z),
+                    int(has_m),
+                ]
             ],
         )
+
+        sql = "SELECT 1 FROM gpkg_spatial_ref_sys WHERE srs_id = ? LIMIT 1"
+        if con.execute(sql, (wkid,)).fetchone() is None:
+            res = lookup_coordinate_system(wkid=wkid)[0]
+            _insert_values(
+                con=con,
+                tbl="gpkg_spatial_ref_sys",
+                fields=[
+                    "srs_name",
+                    "srs_id",
+                    "organization",
+                    "description",
+                    "organization_coordsys_id",
+                    "definition",
+                ],
+                values=[[res.NAME, wkid, "ESRI", res.NAME, res.WKID, res.WKT]],
+            )
     return True
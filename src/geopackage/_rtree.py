@@ -2,51 +2,133 @@
 Defined functions for r-tree index as specified in
 https://github.com/opengeospatial/geopackage/blob/master/spec/annexes/extension_spatialindex.adoc
 """
+import struct
+import sqlite3
+
 from ._wkb import loads as _loads
 from ._wkb import dumps as _dumps
+from ._wkb import NULL_WKB, ENVELOPE_SIZES
+
+try:
+    import numpy as np
+
+    _HASNUMPY = True
+except ImportError:
+    _HASNUMPY = False
 
 try:
     from geomet.wkb import loads as _geomet_loads
     from geomet.wkb import dumps as _geomet_dumps
 except:
     pass
+_UINT32 = {"<": struct.Struct("<I"), ">": struct.Struct(">I")}
 # --------------------------------------------------------------------------
 def _strip_header(g):
-    """removes the GP header"""
-    if g[:2] == b"GB":
-        return g[8:]
-    return g
+    """
+    removes the GP header and envelope, returning a memoryview of the WKB
+    so the geometry is not copied
+    """
+    view = memoryview(g)
+    if g[:2] == b"GP":
+        return view[8 + ENVELOPE_SIZES[(g[3] >> 1) & 0x07] :]
+    return view
 
 
-def _flatten_list(coords):
-    """moves all x,y pairs into two lists"""
-    minx, maxx = None, None
-    miny, maxy = None, None
-    for prt in coords:
-        for xy in prt:
-            if miny is None and maxy is None:
-                miny = xy[1]
-                maxy = xy[1]
-            if minx is None and maxx is None:
-                minx = xy[0]
-                maxx = xy[0]
+# --------------------------------------------------------------------------
+def _read_points(g, offset, count, dims, order):
+    """reads `count` points and returns the x and y values"""
+    if _HASNUMPY:
+        arr = np.frombuffer(
+            g, dtype=order + "f8", count=count * dims, offset=offset
+        ).reshape(-1, dims)
+        return arr[:, 0], arr[:, 1]
+    values = struct.unpack_from(order + "d" * (count * dims), g, offset)
+    return values[0::dims], values[1::dims]
 
-    return [], []
 
+# --------------------------------------------------------------------------
+def _wkb_coords(g, offset=0):
+    """
+    walks a WKB geometry and returns a list of (xs, ys) coordinate arrays,
+    one per point, ring or line, along with the offset where it ends
+    """
+    order = "<" if g[offset] == 1 else ">"
+    (gtype,) = _UINT32[order].unpack_from(g, offset + 1)
+    offset += 5
+    dims = 2 + bool(gtype & 0x80000000) + bool(gtype & 0x40000000)
+    gtype &= 0x0FFFFFFF
+    dims += (0, 1, 1, 2)[gtype // 1000]
+    gtype %= 1000
+    if gtype == 1:
+        parts = [_read_points(g, offset, 1, dims, order)]
+        return parts, offset + 8 * dims
+    (count,) = _UINT32[order].unpack_from(g, offset)
+    offset += 4
+    parts = []
+    if gtype == 2:
+        parts.append(_read_points(g, offset, count, dims, order))
+        offset += 8 * dims * count
+    elif gtype == 3:
+        for _ in range(count):
+            (npts,) = _UINT32[order].unpack_from(g, offset)
+            parts.append(_read_points(g, offset + 4, npts, dims, order))
+            offset += 4 + 8 * dims * npts
+    elif gtype in (4, 5, 6, 7):
+        for _ in range(count):
+            sub, offset = _wkb_coords(g, offset)
+            parts.extend(sub)
+    else:
+        raise ValueError("Unsupported geometry type %s" % gtype)
+    return parts, offset
 
-def _extent(g, t="xmin"):
-    """gets the extent value from the geometry"""
-    geom = _strip_header(geom)
-    j = _dumps(geom)
-    if t == "xmin":
-        if "x" in j:
-            return j["x"]
-        elif "rings" in j:
 
-            return
+# --------------------------------------------------------------------------
+def _envelope(g):
+    """
+    returns the (minx, maxx, miny, maxy) of a geometry, or None when the
+    geometry is empty
+    """
+    g = _strip_header(g)
+    if g == NULL_WKB or len(g) < 5:
+        return None
+    parts, _ = _wkb_coords(g)
+    parts = [(xs, ys) for xs, ys in parts if len(xs)]
+    if not parts:
+        return None
+    if _HASNUMPY:
+        xs = np.concatenate([p[0] for p in parts])
+        ys = np.concatenate([p[1] for p in parts])
+        if np.isnan(xs).all():
+            return None
+        return (
+            float(np.nanmin(xs)),
+            float(np.nanmax(xs)),
+            float(np.nanmin(ys)),
+            float(np.nanmax(ys)),
+        )
+    xs = [x for p in parts for x in p[0] if x == x]
+    ys = [y for p in parts for y in p[1] if y == y]
+    if not xs:
+        return None
+    return min(xs), max(xs), min(ys), max(ys)
+
 
-    elif "y" in j:
-        return j["y"]
+#: the last geometry passed to `_extent` and its envelope.  The R-tree
+#: triggers call ST_MinX, ST_MaxX, ST_MinY and ST_MaxY on the same value in
+#: turn, so only the first call walks the geometry.
+_last_envelope = (None, None)
+_EXTENT_INDEX = {"xmin": 0, "xmax": 1, "ymin": 2, "ymax": 3}
+# --------------------------------------------------------------------------
+def _extent(g, t="xmin"):
+    """gets the extent value from the geometry"""
+    global _last_envelope
+    last, env = _last_envelope
+    if last is None or last != g:
+        env = _envelope(g)
+        _last_envelope = (bytes(g), env)
+    if env is None:
+        return None
+    return env[_EXTENT_INDEX[t]]
 
 
 # --------------------------------------------------------------------------
@@ -57,7 +139,7 @@ def ST_IsEmpty(geom):
     if geom is None:
         return None
     geom = _strip_header(geom)
-    if geom == b"0x000000000000f87f":
+    if geom == NULL_WKB:
         return 1
     return 0
 
@@ -67,10 +149,9 @@ def ST_MinX(geom):
     """
     Returns the minimum X value of the bounding envelope of a geometry
     """
-    geom = _strip_header(geom)
-    j = _dumps(geom)
-
-    return
+    if geom is None:
+        return None
+    return _extent(geom, "xmin")
 
 
 # --------------------------------------------------------------------------
@@ -78,8 +159,9 @@ def ST_MinY(geom):
     """
     Returns the minimum Y value of the bounding envelope of a geometry
     """
-    geom = _strip_header(geom)
-    return
+    if geom is None:
+        return None
+    return _extent(geom, "ymin")
 
 
 # --------------------------------------------------------------------------
@@ -87,8 +169,9 @@ def ST_MaxX(geom):
     """
     Returns the maximum X value of the bounding envelope of a geometry
     """
-    geom = _strip_header(geom)
-    return
+    if geom is None:
+        return None
+    return _extent(geom, "xmax")
 
 
 # --------------------------------------------------------------------------
@@ -96,5 +179,26 @@ def ST_MaxY(geom):
     """
     Returns the maximum Y value of the bounding envelope of a geometry
     """
-    geom = _strip_header(geom)
-    return
+    if geom is None:
+        return None
+    return _extent(geom, "ymax")
+
+
+# --------------------------------------------------------------------------
+def _register_functions(con):
+    """
+    registers the ST_* functions on a connection.  They are flagged as
+    deterministic so SQLite can reuse a result within a statement.
+    """
+    for name, func in (
+        ("ST_IsEmpty", ST_IsEmpty),
+        ("ST_MinX", ST_MinX),
+        ("ST_MinY", ST_MinY),
+        ("ST_MaxX", ST_MaxX),
+        ("ST_MaxY", ST_MaxY),
+    ):
+        try:
+            con.create_function(name, 1, func, deterministic=True)
+        except (TypeError, sqlite3.NotSupportedError):
+            con.create_function(name, 1, func)
+    return con
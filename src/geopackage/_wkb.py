@@ -12,6 +12,28 @@ from ._utils import as_bin_str
 from ._utils import flatten_multi_dim
 from itertools import chain
 
+try:
+    import shapely
+    from shapely.geometry import shape as _shapely_shape
+
+    _HASSHAPELY = hasattr(shapely, "to_wkb")
+except ImportError:
+    _HASSHAPELY = False
+
+try:
+    import geomet
+
+    _HASGEOMET = True
+except ImportError:
+    _HASGEOMET = False
+
+try:
+    import numpy as np
+
+    _HASNUMPY = True
+except ImportError:
+    _HASNUMPY = False
+
 #: '\x00': The first byte of any WKB string. Indicates big endian byte
 #: ordering for the data.
 BIG_ENDIAN = b"\x00"
@@ -21,6 +43,12 @@ LITTLE_ENDIAN = b"\x01"
 #: High byte in a 4-byte geometry type field to indicate that a 4-byte SRID
 #: field follows.
 SRID_FLAG = b"\x20"
+#: NaN as a little endian 8-byte double (0x000000000000f87f). Written as the
+#: geometry of a NULL shape.
+NULL_WKB = struct.pack("<d", float("nan"))
+#: Size in bytes of the GeoPackage binary envelope, indexed by the envelope
+#: indicator bits of the header flags.
+ENVELOPE_SIZES = (0, 32, 48, 48, 64)
 
 #: Mapping of GeoJSON geometry types to the "2D" 4-byte binary string
 #: representation for WKB. "2D" indicates that the geometry is 2-dimensional,
@@ -96,6 +124,16 @@ _BINARY_TO_GEOM_TYPE = dict(
 
 _INT_TO_DIM_LABEL = {2: "2D", 3: "Z", 4: "ZM"}
 
+#: Precompiled 4-byte count fields (number of vertices, rings, parts) keyed by
+#: byte order.
+_COUNT = {"<": struct.Struct("<l"), ">": struct.Struct(">l")}
+#: Precompiled 4-byte SRID field keyed by `big_endian`.
+_SRID = {False: struct.Struct("<i"), True: struct.Struct(">i")}
+
+#: Little endian byte order and type of a 2D point, the first 5 bytes of every
+#: point written by :func:`esrijson_to_wkb`.
+_POINT_LE = LITTLE_ENDIAN + WKB_2D["Point"][::-1]
+
 
 def _get_geom_type(type_bytes):
     """Get the GeoJSON geometry type label from a WKB type byte string.
@@ -257,6 +295,61 @@ def loads(string, wkid=4326):
     return result
 
 
+def geojson_to_wkb(obj, use_shapely=False):
+    """
+    Converts a GeoJSON `dict`, or a list of them, to WKB.  When shapely 2.0+
+    is installed and `use_shapely` is True, or geomet is missing, the
+    conversion runs in shapely's C code, otherwise `geomet` is used.
+    """
+    if _HASSHAPELY and (use_shapely or not _HASGEOMET):
+        if isinstance(obj, dict):
+            return shapely.to_wkb(_shapely_shape(obj), byte_order=1)
+        return list(shapely.to_wkb([_shapely_shape(o) for o in obj], byte_order=1))
+    from geomet import wkb as geometwkb
+
+    if isinstance(obj, dict):
+        return geometwkb.dumps(obj=obj)
+    return [geometwkb.dumps(obj=o) for o in obj]
+
+
+def esrijson_to_wkb(obj):
+    """
+    Converts an Esri JSON `dict`, or a list of them, to little endian WKB.
+    When numpy is installed a list of points is packed into one buffer and
+    the vertices of paths and rings are copied as arrays instead of one
+    `struct.pack` per vertex.
+    """
+    if isinstance(obj, dict):
+        return dumps(obj, False)
+    if _HASNUMPY and obj and all("x" in g and "meta" not in g for g in obj):
+        points = np.empty(len(obj), dtype=[("h", "S5"), ("xy", "<f8", 2)])
+        points["h"] = _POINT_LE
+        points["xy"] = [(g["x"], g["y"]) for g in obj]
+        buf = points.tobytes()
+        size = points.itemsize
+        return [buf[i : i + size] for i in range(0, len(buf), size)]
+    return [dumps(g, False) for g in obj]
+
+
+def wkt_to_wkb(wkt, use_shapely=False):
+    """
+    Converts a WKT string, or a list of them, to WKB.  When shapely 2.0+ is
+    installed and `use_shapely` is True, or geomet is missing, the text is
+    parsed once in C and a list is converted in a single vectorized call.
+    Otherwise `geomet` parses each value into a dict and then dumps it.
+    """
+    if _HASSHAPELY and (use_shapely or not _HASGEOMET):
+        if isinstance(wkt, str):
+            return shapely.to_wkb(shapely.from_wkt(wkt), byte_order=1)
+        return list(shapely.to_wkb(shapely.from_wkt(wkt), byte_order=1))
+    from geomet import wkb as geometwkb
+    from geomet import wkt as geometwkt
+
+    if isinstance(wkt, str):
+        return geometwkb.dumps(obj=geometwkt.loads(wkt))
+    return [geometwkb.dumps(obj=geometwkt.loads(w)) for w in wkt]
+
+
 def _unsupported_geom_type(geom_type):
     raise ValueError("Unsupported geometry type '%s'" % geom_type)
 
@@ -292,16 +385,27 @@ def _header_bytefmt_byteorder(geom_type, num_dims, big_endian, meta=None):
     if srid is not None:
         srid = int(srid)
 
-        if big_endian:
-            srid_header = struct.pack(">i", srid)
-        else:
-            srid_header = struct.pack("<i", srid)
-        header += srid_header
+        header += _SRID[big_endian].pack(srid)
     byte_fmt += b"d" * num_dims
 
     return header, byte_fmt, byte_order
 
 
+def _pack_vertices(vertices, byte_fmt, num_dims):
+    """
+    Packs a list of vertices as doubles.  Uses a single numpy copy when
+    numpy is installed and every vertex has `num_dims` values.
+    """
+    if _HASNUMPY and len(vertices) > 1:
+        try:
+            arr = np.asarray(vertices, dtype=byte_fmt[:1].decode() + "f8")
+        except (ValueError, TypeError):
+            arr = None
+        if arr is not None and arr.shape == (len(vertices), num_dims):
+            return arr.tobytes()
+    return b"".join([struct.pack(byte_fmt, *vertex) for vertex in vertices])
+
+
 def _dump_point(obj, big_endian, meta):
     """
     Dump a EsriJSON-like `dict` to a point WKB string.
@@ -352,10 +456,8 @@ def _dump_linestring(obj, big_endian, meta):
         "LineString", num_dims, big_endian, meta
     )
     # append number of vertices in linestring
-    wkb_string += struct.pack("%sl" % byte_order, len(coords))
-
-    for vertex in coords:
-        wkb_string += struct.pack(byte_fmt, *vertex)
+    wkb_string += _COUNT[byte_order].pack(len(coords))
+    wkb_string += _pack_vertices(coords, byte_fmt, num_dims)
 
     return wkb_string
 
@@ -376,12 +478,11 @@ def _dump_polygon(obj, big_endian, meta):
     )
 
     # number of rings:
-    wkb_string += struct.pack("%sl" % byte_order, len(coords))
+    wkb_string += _COUNT[byte_order].pack(len(coords))
     for ring in coords:
         # number of verts in this ring:
-        wkb_string += struct.pack("%sl" % byte_order, len(ring))
-        for vertex in ring:
-            wkb_string += struct.pack(byte_fmt, *vertex)
+        wkb_string += _COUNT[byte_order].pack(len(ring))
+        wkb_string += _pack_vertices(ring, byte_fmt, num_dims)
 
     return wkb_string
 
@@ -406,7 +507,7 @@ def _dump_multipoint(obj, big_endian, meta):
     else:
         point_type = LITTLE_ENDIAN + point_type[::-1]
 
-    wkb_string += struct.pack("%sl" % byte_order, len(coords))
+    wkb_string += _COUNT[byte_order].pack(len(coords))
     for vertex in coords:
         # POINT type strings
         wkb_string += point_type
@@ -436,14 +537,13 @@ def _dump_multilinestring(obj, big_endian, meta):
         ls_type = LITTLE_ENDIAN + ls_type[::-1]
 
     # append the number of linestrings
-    wkb_string += struct.pack("%sl" % byte_order, len(coords))
+    wkb_string += _COUNT[byte_order].pack(len(coords))
 
     for linestring in coords:
         wkb_string += ls_type
         # append the number of vertices in each linestring
-        wkb_string += struct.pack("%sl" % byte_order, len(linestring))
-        for vertex in linestring:
-            wkb_string += struct.pack(byte_fmt, *vertex)
+        wkb_string += _COUNT[byte_order].pack(len(linestring))
+        wkb_string += _pack_vertices(linestring, byte_fmt, num_dims)
 
     return wkb_string
 
@@ -469,18 +569,17 @@ def _dump_multipolygon(obj, big_endian, meta):
         poly_type = LITTLE_ENDIAN + poly_type[::-1]
 
     # apped the number of polygons
-    wkb_string += struct.pack("%sl" % byte_order, len(coords))
+    wkb_string += _COUNT[byte_order].pack(len(coords))
 
     for polygon in coords:
         # append polygon header
         wkb_string += poly_type
         # append the number of rings in this polygon
-        wkb_string += struct.pack("%sl" % byte_order, len(polygon))
+        wkb_string += _COUNT[byte_order].pack(len(polygon))
         for ring in polygon:
             # append the number of vertices in this ring
-            wkb_string += struct.pack("%sl" % byte_order, len(ring))
-            for vertex in ring:
-                wkb_string += struct.pack(byte_fmt, *vertex)
+            wkb_string += _COUNT[byte_order].pack(len(ring))
+            wkb_string += _pack_vertices(ring, byte_fmt, num_dims)
 
     return wkb_string
 
@@ -509,7 +608,7 @@ def _dump_geometrycollection(obj, big_endian, meta):
         "GeometryCollection", num_dims, big_endian, meta
     )
     # append the number of geometries
-    wkb_string += struct.pack("%sl" % byte_order, len(geoms))
+    wkb_string += _COUNT[byte_order].pack(len(geoms))
 
     wkb_string += first_wkb
     for geom in rest:
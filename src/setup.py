@@ -2,79 +2,62 @@
 See:
 https://packaging.python.org/en/latest/distributing.html
 https://github.com/pypa/sampleproject
-"""
-
-# Always prefer setuptools over distutils
-from setuptools import setup
-from setuptools import find_packages
-from setuptools.command.develop import develop as _develop
-from setuptools.command.install import install as _install
-from setuptools.command.egg_info import egg_info as _egg_info
 
-# To use a consistent encoding
+The package metadata lives in pyproject.toml. This file is kept so legacy
+`python setup.py` and editable installs keep working, and to build the
+prj.sqlite coordinate system index that ships beside prj.json.
+"""
 import os
-import sys
-from glob import glob
-import logging
-
-# TODO
-from distutils.core import setup
-from codecs import open
-from os import path
-
-
-here = path.abspath(path.dirname(__file__))
-
-packages = ["geopackage"]
-
-# Get the long description from the README file
-try:
-    with open(path.join(here, "README.md"), encoding="utf-8") as f:
-        long_decription = f.read()
-except:
-    long_decription = "Python GeoPackage Package"
+import json
+import zlib
+import sqlite3
 
 from setuptools import setup
-
-
-def read_file(file):
-    with open(file, "rb") as fh:
-        data = fh.read()
-    return data.decode("utf-8")
-
-
-setup(
-    name="geopackage",
-    version="1.0.0",
-    description="Pure Python reader/writer of geopackages",
-    long_description=read_file("README.md"),
-    long_description_content_type="text/markdown",
-    author="Andrew Chapkowski",
-    author_email="andrewonboe@gmail.com",
-    url="https://github.com/achapkowski/pygeopackage",
-    py_modules=["geopackage"],
-    packages=packages,
-    license="Apache License 2.0",
-    keywords="gis, geospatial, geographic, geopackage, ogc, wkb, wkt, geojson, spatial, Esri, ArcGIS, Python, ArcPy, qgis",
-    python_requires=">= 2.7",
-    classifiers=[
-        "Topic :: Scientific/Engineering :: GIS",
-        "Topic :: Software Development :: Libraries",
-        "Topic :: Software Development :: Libraries :: Python Modules",
-        "Topic :: Software Development :: Esri REST API",
-        "Intended Audience :: Developers/GIS Users",
-        "License :: Apache License",
-        "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.2",
-        "Programming Language :: Python :: 3.3",
-        "Programming Language :: Python :: 3.4",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
-        "Development Status :: 5 - Production/Stable",
-    ],
-    include_package_data=True,
-    zip_safe=False,
-    install_requires=["pandas", "geomet"],
-    extras_require={},
-    package_data={"geopackage": ["prj.json"]},
-)
+from setuptools.command.build_py import build_py
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PRJ_JSON = os.path.join(HERE, "geopackage", "prj.json")
+
+# ----------------------------------------------------------------------
+def build_prj_db(dst, src=PRJ_JSON):
+    """
+    writes the indexed (wkid, name, wkt) table read by geopackage._coord.
+    A CRC32 of prj.json is stored as the user_version, so the package
+    only trusts an index built from the prj.json it ships with.
+    """
+    with open(src, "rb") as reader:
+        raw = reader.read()
+    data = json.loads(raw)
+    rows = zip(map(int, data["Well-known ID"]), data["Name"], data["Well-known text"])
+    tmp = dst + ".tmp"
+    if os.path.isfile(tmp):
+        os.remove(tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute(
+            "CREATE TABLE prj (wkid INTEGER PRIMARY KEY, name TEXT NOT NULL, wkt TEXT NOT NULL)"
+        )
+        con.executemany("INSERT INTO prj VALUES (?, ?, ?)", rows)
+        # user_version is a signed 32-bit integer
+        checksum = zlib.crc32(raw) & 0x7FFFFFFF
+        con.execute("PRAGMA user_version={v}".format(v=checksum))
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, dst)
+    return dst
+
+
+########################################################################
+class BuildPy(build_py):
+    """builds prj.sqlite into the build directory beside the package"""
+
+    def run(self):
+        super().run()
+        if not self.dry_run:
+            folder = os.path.join(self.build_lib, "geopackage")
+            os.makedirs(folder, exist_ok=True)
+            build_prj_db(os.path.join(folder, "prj.sqlite"))
+
+
+setup(cmdclass={"build_py": BuildPy})
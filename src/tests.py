@@ -3,27 +3,25 @@ PyTests for validating the package.
 """
 
 import os
-import unittest
+import copy
+import stat
+import shutil
+import struct
+import sqlite3
+import importlib.util
 import pytest
 
 import geopackage
-from geopackage import GeoPackage
+from geopackage import GeoPackage, _coord, _wkb
 from geopackage._geopackage import _Row, SpatialTable, Table
+from geopackage._gpkg import _init_gpkg
+from geopackage._rtree import ST_MinX, ST_MaxX, ST_MinY, ST_MaxY, ST_IsEmpty
+from geopackage._wkb import NULL_WKB, dumps
 
 _requires_dependency_cache = {}
 
-try:
-    import arcpy
-
-    HASARCPY = True
-except ImportError:
-    HASARCPY = False
-try:
-    import shapely
-
-    HASSHAPELY = True
-except:
-    HASSHAPELY = False
+HASARCPY = importlib.util.find_spec("arcpy") is not None
+HASSHAPELY = importlib.util.find_spec("shapely") is not None
 
 
 point = {"x": -118.15, "y": 33.80, "spatialReference": {"wkid": 4326}}
@@ -66,6 +64,31 @@ polygon = {
     ],
     "spatialReference": {"wkid": 4326},
 }
+# little endian WKB of the shapes above, encoded once for every test
+POINT_WKB = dumps(obj=point, big_endian=False)
+POLYLINE_WKB = dumps(obj=polyline, big_endian=False)
+MULTIPOINT_WKB = dumps(obj=multipoint, big_endian=False)
+POLYGON_WKB = dumps(obj=polygon, big_endian=False)
+
+
+@pytest.fixture(scope="session")
+def _template_gpkg(tmp_path_factory):
+    """builds an empty geopackage with 64 KB pages once for the whole session"""
+    path = tmp_path_factory.mktemp("template") / "template.gpkg"
+    with GeoPackage(path=str(path), page_size=65536):
+        pass
+    return path
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch, _template_gpkg):
+    """
+    runs each test in its own temporary directory, seeded with copies of
+    the empty template under the file names the tests open
+    """
+    for name in ("sample1.gpkg", "sample1960s.gpkg"):
+        shutil.copyfile(_template_gpkg, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
 
 
 def requires_dependency(name):
@@ -86,375 +109,925 @@ def requires_dependency(name):
     if name in _requires_dependency_cache:
         skip_it = _requires_dependency_cache[name]
     else:
-        try:
-            __import__(name)
-            skip_it = False
-        except ImportError:
-            skip_it = True
-
+        # find_spec locates the package without running its __init__
+        skip_it = importlib.util.find_spec(name) is None
         _requires_dependency_cache[name] = skip_it
 
     reason = "Missing dependency: {}".format(name)
     return pytest.mark.skipif(skip_it, reason=reason)
 
 
-class TestGeoPackageClass(unittest.TestCase):
-    """
-    Tests the geopackage level operations
-    """
+########################################################################
+# Tests the geopackage level operations
+########################################################################
+def test_with_context():
+    with GeoPackage(path="sample1.gpkg") as gpkg:
+        assert gpkg._con
 
-    def test_with_context(self):
-        with GeoPackage(path="sample1.gpkg") as gpkg:
-            assert gpkg._con
-        os.remove("sample1.gpkg")
-
-    def test_create_overwrite(self):
-        """tests creation gpkg patterns"""
-        gpkg = GeoPackage("sample1.gpkg")
-        del gpkg
-        gpkg = GeoPackage("sample1.gpkg", True)
-        del gpkg
-        gpkg = GeoPackage("sample1.gpkg", False)
-        del gpkg
-        os.remove("sample1.gpkg")
-
-    def test_length(self):
-        with GeoPackage(path="sample1.gpkg") as gpkg:
-            assert len(gpkg) == 0
-            gpkg.create(name="TommyTutone")
-            assert len(gpkg) == 1
-        os.remove("sample1.gpkg")
-
-    def test_gpkg_create_table(self):
-        """tests creating attribute tables"""
-        with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
-            from geopackage._geopackage import Table
-
-            tbl = gpkg.create(name="TwistedSister")
-            assert isinstance(tbl, Table)
-        os.remove("sample1.gpkg")
-
-    def test_gpkg_create_spatial_table(self):
-        """tests creating spatial tables"""
-        with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
-            from geopackage._geopackage import SpatialTable
-
-            tbl = gpkg.create(name="MenWithoutHats", wkid=4326, geometry_type="polygon")
-            assert isinstance(tbl, SpatialTable)
-        os.remove("sample1.gpkg")
-
-    def test_exists(self):
-        """tests the table exists function"""
-        with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
-            assert gpkg.exists("Maroon5") == False  # not an 80s band
-            gpkg.create(name="TommyTutone")
-            assert gpkg.exists("TommyTutone") == True
-        os.remove("sample1.gpkg")
-
-    def test_list_tables(self):
-        """tests listing tables"""
-        with GeoPackage(path="sample1.gpkg") as gpkg:
-            assert len(gpkg) == 0
-            gpkg.create(name="TommyTutone")
-            gpkg.create(name="Timbuk3", wkid=4326, geometry_type="point")
-            assert len(gpkg) == 2
-            assert len([tbl for tbl in gpkg.tables]) == 2
-        os.remove("sample1.gpkg")
-
-    def test_get_tables(self):
-        """tests listing tables"""
-        with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
-            assert len(gpkg) == 0
-            gpkg.create(name="TommyTutone")
-            gpkg.create(name="Timbuk3", wkid=4326, geometry_type="point")
-            gpkg.create(name="Kajagoogoo", wkid=4326, geometry_type="multipoint")
-            gpkg.create(name="DeborahAllen", wkid=4326, geometry_type="polygon")
-            gpkg.create(name="ThomasDolby", wkid=4326, geometry_type="line")
-            assert gpkg.get("TommyTutone")
-            assert gpkg.get("Chumbawamba") is None  # 90s Band, I SHOULD NOT EXIST
-        os.remove("sample1.gpkg")
-
-    def test_create_table_fields_test(self):
-        """
-        Creates a tables with multiple table field combinations
-
-        """
-        fields = {
-            "txtfld": "TEXT",
-            "field1": "BLOB",
-            "field2": "FLOAT",
-            "field3": "DOUBLE",
-            "field4": "SHORT",
-            "field5": "DATE",
-            "field6": "GUID",
-        }
-        with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
-            assert len(gpkg) == 0
-            tbl1 = gpkg.create(name="JackWagner")
-            tbl2 = gpkg.create(name="Devo", fields=fields)
-            assert len(tbl1.fields) == 1  #  1 accounts for OBJECTID
-            assert len(tbl2.fields) == (len(fields) + 1)  # +1 accounts for OBJECTID
-        os.remove("sample1.gpkg")
-
-    def test_create_spatial_table_fields_test(self):
-        """
-        Creates a spatial tables with multiple table field combinations
-
-        """
-        fields = {
-            "txtfld": "TEXT",
-            "field1": "BLOB",
-            "field2": "FLOAT",
-            "field3": "DOUBLE",
-            "field4": "SHORT",
-            "field5": "DATE",
-            "field6": "GUID",
-        }
-        with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
+
+def test_page_size_synchronous():
+    """tests the page size and synchronous mode can be chosen on creation"""
+    with GeoPackage(path="Wham.gpkg", page_size=65536, synchronous="OFF") as gpkg:
+        assert gpkg._con.execute("PRAGMA page_size").fetchone()[0] == 65536
+        assert gpkg._con.execute("PRAGMA synchronous").fetchone()[0] == 0
+    with GeoPackage(path="sample1.gpkg") as gpkg:
+        assert gpkg._con.execute("PRAGMA page_size").fetchone()[0] == 65536
+    with pytest.raises(ValueError):
+        GeoPackage(path=":memory:", synchronous="SOMETIMES")
+
+
+def test_wal_existing_file():
+    """tests an existing file keeps its journal mode unless wal is set"""
+    con = sqlite3.connect("sample1.gpkg")
+    con.execute("PRAGMA journal_mode=DELETE")
+    con.close()
+    sql = "PRAGMA journal_mode"
+    with GeoPackage(path="sample1.gpkg") as gpkg:
+        assert gpkg._con.execute(sql).fetchone()[0] == "delete"
+    assert not os.path.exists("sample1.gpkg-wal")
+    with GeoPackage(path="sample1.gpkg", wal=True) as gpkg:
+        assert gpkg._con.execute(sql).fetchone()[0] == "wal"
+    with GeoPackage(path="Wham.gpkg") as gpkg:
+        assert gpkg._con.execute(sql).fetchone()[0] == "wal"
+
+
+def test_read_only_file():
+    """tests an existing geopackage opens without writing to it"""
+
+    con = sqlite3.connect("sample1.gpkg")
+    con.execute("PRAGMA journal_mode=DELETE")
+    con.close()
+    shutil.copyfile("sample1.gpkg", "readonly.gpkg")
+    os.chmod("readonly.gpkg", stat.S_IREAD)
+    # root ignores the file mode, so a second writer holds the write lock
+    blocker = sqlite3.connect("readonly.gpkg")
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        with GeoPackage(path="readonly.gpkg") as gpkg:
             assert len(gpkg) == 0
-            tbl1 = gpkg.create(name="Quarterflash", wkid=2351, geometry_type="point")
-            tbl2 = gpkg.create(
-                name="TheWeatherGirls", fields=fields, wkid=4768, geometry_type="line"
+            assert gpkg.exists("TommyTutone") == False
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert not os.path.exists("readonly.gpkg-wal")
+
+
+def test_checkpoint():
+    """tests the write-ahead log is emptied by a checkpoint"""
+    with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
+        assert gpkg._con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        gpkg.create(name="Journey")
+        assert gpkg.checkpoint()
+        assert os.path.getsize("sample1.gpkg-wal") == 0
+
+
+def test_create_overwrite():
+    """tests creation gpkg patterns"""
+    with GeoPackage("sample1.gpkg") as gpkg:
+        gpkg.create(name="TheKnack")
+    with GeoPackage("sample1.gpkg", overwrite=False) as gpkg:
+        assert len(gpkg) == 1
+    with GeoPackage("sample1.gpkg", overwrite=True) as gpkg:
+        assert len(gpkg) == 0
+
+
+def test_length():
+    with GeoPackage(path=":memory:") as gpkg:
+        assert len(gpkg) == 0
+        gpkg.create(name="TommyTutone")
+        assert len(gpkg) == 1
+
+
+def test_gpkg_create_table():
+    """tests creating attribute tables"""
+    with GeoPackage(path=":memory:") as gpkg:
+
+        tbl = gpkg.create(name="TwistedSister")
+        assert isinstance(tbl, Table)
+    # only the seeded template copies, nothing was written to disk
+    assert sorted(os.listdir(".")) == ["sample1.gpkg", "sample1960s.gpkg"]
+
+
+def test_memory_gpkg_template():
+    """tests in-memory geopackages are independent copies of a full schema"""
+
+    sql = "SELECT type, name, sql FROM sqlite_master ORDER BY name"
+    expected = _init_gpkg(sqlite3.connect(":memory:")).execute(sql).fetchall()
+    with GeoPackage(path=":memory:") as gpkg1, GeoPackage(path=":memory:") as gpkg2:
+        assert gpkg1._con.execute(sql).fetchall() == expected
+        gpkg1.create(name="Toto", wkid=4326, geometry_type="point")
+        assert gpkg1.exists("Toto") and not gpkg2.exists("Toto")
+        assert gpkg2._con.execute(sql).fetchall() == expected
+
+
+def test_gpkg_create_spatial_table():
+    """tests creating spatial tables"""
+    with GeoPackage(path=":memory:") as gpkg:
+
+        tbl = gpkg.create(name="MenWithoutHats", wkid=4326, geometry_type="polygon")
+        assert isinstance(tbl, SpatialTable)
+
+
+def test_gpkg_create_spatial_table_alias_wkid():
+    """tests an aliased wkid is registered once under the requested id"""
+    with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
+        gpkg.create(name="Devo", wkid=102100, geometry_type="point")
+        tbl = gpkg.create(name="Blondie", wkid=102100, geometry_type="point")
+        assert tbl.wkid == 102100
+        sql = "SELECT organization_coordsys_id FROM gpkg_spatial_ref_sys WHERE srs_id = 102100"
+        assert gpkg._con.execute(sql).fetchall() == [(3857,)]
+
+
+def test_gpkg_create_spatial_table_rollback():
+    """tests a failed feature class creation leaves nothing behind"""
+    with GeoPackage(path="sample1.gpkg", overwrite=True) as gpkg:
+        with pytest.raises(ValueError):
+            gpkg.create(name="Nena", wkid=999999, geometry_type="point")
+        assert gpkg.exists("Nena") == False
+        sql = "SELECT count(*) FROM sqlite_master WHERE name = 'Nena'"
+        assert gpkg._con.execute(sql).fetchone()[0] == 0
+
+
+def test_create_many_rollback():
+    """tests a failure in create_many creates none of the tables"""
+    with GeoPackage(path="sample1.gpkg") as gpkg:
+        with pytest.raises(ValueError):
+            gpkg.create_many(
+                [
+                    {"name": "TommyTutone"},
+                    {"name": "Nena", "wkid": 999999, "geometry_type": "point"},
+                ]
+            )
+        assert len(gpkg) == 0
+        assert gpkg.exists("TommyTutone") == False
+        with pytest.raises(sqlite3.OperationalError):
+            gpkg.create_many(
+                [
+                    {"name": "TommyTutone"},
+                    {"name": "Kajagoogoo", "fields": {"OBJECTID": "INTEGER"}},
+                ]
             )
-            assert len(tbl1.fields) == 2  #  2 (OBJECTID and SHAPE COLUMN)
-            assert len(tbl2.fields) == (len(fields) + 2)
-        os.remove("sample1.gpkg")
+        assert len(gpkg) == 0
+        sql = "SELECT count(*) FROM sqlite_master WHERE name = 'TommyTutone'"
+        assert gpkg._con.execute(sql).fetchone()[0] == 0
+
+
+def test_exists():
+    """tests the table exists function"""
+    with GeoPackage(path=":memory:") as gpkg:
+        assert gpkg.exists("Maroon5") == False  # not an 80s band
+        gpkg.create(name="TommyTutone")
+        assert gpkg.exists("TommyTutone") == True
+        # table names are case-insensitive, get agrees with exists
+        assert gpkg.exists("TOMMYTUTONE") == True
+        assert gpkg.get("TOMMYTUTONE")._table_name == "TommyTutone"
+
+
+def test_list_tables():
+    """tests listing tables"""
+    with GeoPackage(path=":memory:") as gpkg:
+        assert len(gpkg) == 0
+        gpkg.create_many(
+            [
+                {"name": "TommyTutone"},
+                {"name": "Timbuk3", "wkid": 4326, "geometry_type": "point"},
+            ]
+        )
+        assert len(gpkg) == 2
+        assert sum(1 for _ in gpkg.tables) == 2
+
+
+@pytest.mark.parametrize(
+    "name,geometry_type",
+    [
+        ("Timbuk3", "point"),
+        ("Kajagoogoo", "multipoint"),
+        ("DeborahAllen", "polygon"),
+        ("ThomasDolby", "line"),
+    ],
+)
+def test_get_tables(name, geometry_type):
+    """tests listing tables"""
+    with GeoPackage(path=":memory:") as gpkg:
+        assert len(gpkg) == 0
+        gpkg.create_many(
+            [
+                {"name": "TommyTutone"},
+                {"name": name, "wkid": 4326, "geometry_type": geometry_type},
+            ]
+        )
+        assert gpkg.get("TommyTutone")
+        assert isinstance(gpkg.get(name), SpatialTable)
+        assert gpkg.get("Chumbawamba") is None  # 90s Band, I SHOULD NOT EXIST
 
 
-class TestTableClass(unittest.TestCase):
+def test_create_table_fields_test():
     """
-    Tests the geopackage table/spatial table level operations
+    Creates a tables with multiple table field combinations
+
     """
+    fields = {
+        "txtfld": "TEXT",
+        "field1": "BLOB",
+        "field2": "FLOAT",
+        "field3": "DOUBLE",
+        "field4": "SHORT",
+        "field5": "DATE",
+        "field6": "GUID",
+    }
+    with GeoPackage(path=":memory:") as gpkg:
+        assert len(gpkg) == 0
+        tbl1 = gpkg.create(name="JackWagner")
+        tbl2 = gpkg.create(name="Devo", fields=fields)
+        assert len(tbl1.fields) == 1  #  1 accounts for OBJECTID
+        assert len(tbl2.fields) == (len(fields) + 1)  # +1 accounts for OBJECTID
 
-    # ---------------------------------------------------------------------
-    def test_add_field(self):
-        """tests adding a field on a table"""
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(name="TheSurfaris")
-            tbl.add_field(name="WipeOut", data_type="TEXT")
-            assert "WipeOut" in tbl.fields.keys()
-        os.remove("sample1960s.gpkg")
-
-    # ---------------------------------------------------------------------
-    def test_remove_field(self):
-        """tests dropping a field on a table"""
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(name="Greenbaum")
-            tbl.add_field(name="SpiritInTheSky", data_type="TEXT")
-            assert "SpiritInTheSky" in tbl.fields.keys()
-            tbl.delete_field(name="SpiritInTheSky")
-            assert not "SpiritInTheSky" in tbl.fields.keys()
-        os.remove("sample1960s.gpkg")
-
-    # ---------------------------------------------------------------------
-    def test_property_attribute_table(self):
-        """tests the dtype property on an attribute table"""
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(name="NapoleonXIV")
-            assert tbl.dtype == "attribute"
-        os.remove("sample1960s.gpkg")
-
-    # ---------------------------------------------------------------------
-    def test_property_spatial_table(self):
-        """tests the dtype property on an attribute table"""
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(name="NapoleonXIV", wkid=4326, geometry_type="point")
-            assert tbl.dtype == "spatial"
-            assert tbl.wkid == 4326
-            assert tbl.geometry_type.lower() == "point"
-        os.remove("sample1960s.gpkg")
-
-    # ---------------------------------------------------------------------
-    def test_rows_table(self):
-        """tests the dtype property on an attribute table"""
-        data = [
-            {"song": "Midnight Mary", "artist": "Joey Powers"},
-            {"song": "What Kind of Fool", "artist": "The Murmaids"},
-            {"song": "Hippy Hippy Shake", "artist": "The Swinging Blue Jeans"},
-        ]
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(
-                name="OneHitWonders", fields={"song": "TEXT", "artist": "TEXT"}
-            )
-            tbl.insert(row=data[0])
-            tbl.insert(row=data[1])
-            tbl.insert(row=data[2])
-            assert len([row for row in tbl.rows()]) == 3
-            assert (
-                len([row for row in tbl.rows(where="""song = 'Midnight Mary'""")]) == 1
-            )
-            row = [
-                row
-                for row in tbl.rows(
-                    where="""song = 'Midnight Mary'""", fields=["artist"]
-                )
-            ][0]
-            assert row.keys() == ["artist", "OBJECTID"]
-            assert row.values() == row.values() == ["Joey Powers", 1]
-        os.remove("sample1960s.gpkg")
-
-    # ---------------------------------------------------------------------
-    def test_rows_spatial_table(self):
-        """tests the spatial insert on an attribute table"""
-        import copy
-        from geopackage._wkb import dumps, loads, load, dump
-
-        data = [
-            {"song": "Midnight Mary", "artist": "Joey Powers", "SHAPE": point},
-            {
-                "song": "What Kind of Fool",
-                "artist": "The Murmaids",
-                "SHAPE": dumps(obj=point, big_endian=False),
-            },
-        ]
 
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(
-                name="OneHitWonders",
-                fields={"song": "TEXT", "artist": "TEXT"},
-                geometry_type="point",
-                wkid=4326,
-            )
+def test_create_spatial_table_fields_test():
+    """
+    Creates a spatial tables with multiple table field combinations
+
+    """
+    fields = {
+        "txtfld": "TEXT",
+        "field1": "BLOB",
+        "field2": "FLOAT",
+        "field3": "DOUBLE",
+        "field4": "SHORT",
+        "field5": "DATE",
+        "field6": "GUID",
+    }
+    with GeoPackage(path=":memory:") as gpkg:
+        assert len(gpkg) == 0
+        tbl1 = gpkg.create(name="Quarterflash", wkid=2351, geometry_type="point")
+        tbl2 = gpkg.create(
+            name="TheWeatherGirls", fields=fields, wkid=4768, geometry_type="line"
+        )
+        assert len(tbl1.fields) == 2  #  2 (OBJECTID and SHAPE COLUMN)
+        assert len(tbl2.fields) == (len(fields) + 2)
+
+
+########################################################################
+# Tests the geopackage table/spatial table level operations
+########################################################################
+# ---------------------------------------------------------------------
+def test_add_field():
+    """tests adding a field on a table"""
+    with GeoPackage(path=":memory:") as gpkg:
+        tbl = gpkg.create(name="TheSurfaris")
+        tbl.add_field(name="WipeOut", data_type="TEXT")
+        assert "WipeOut" in tbl.fields.keys()
+
+
+# ---------------------------------------------------------------------
+def test_add_field_reserved_word():
+    """tests field names are quoted and the check constraints apply"""
+
+    with GeoPackage(path="sample1960s.gpkg", overwrite=True) as gpkg:
+        tbl = gpkg.create(name="TheKinks", fields={"order": "SHORT"})
+        assert tbl.add_field(name="group", data_type="LONG")
+        assert "order" in tbl.fields and "group" in tbl.fields
+        tbl.insert({"order": 1, "group": 2})
+        with pytest.raises(sqlite3.IntegrityError):
+            tbl.insert({"order": 40000, "group": 2})
+        assert tbl.delete_field("group")
+        assert [r["order"] for r in tbl.rows()] == [1]
+
+
+# ---------------------------------------------------------------------
+def test_table_name_with_space():
+    """tests table names are quoted in the generated statements"""
+    with GeoPackage(path="sample1960s.gpkg", overwrite=True) as gpkg:
+        tbl = gpkg.create(name="The Kingsmen", fields={"song": "TEXT"})
+        tbl.insert({"song": "Louie Louie"})
+        tbl.add_field(name="year", data_type="SHORT")
+        row = next(tbl.rows())
+        row["year"] = 1963
+        assert [r["year"] for r in tbl.rows()] == [1963]
+        assert tbl.delete_field("year")
+        assert gpkg.create(name="Paul Revere", geometry_type="point", wkid=4326)
+
+
+# ---------------------------------------------------------------------
+def test_remove_field():
+    """tests dropping a field on a table"""
+    with GeoPackage(path=":memory:") as gpkg:
+        tbl = gpkg.create(name="Greenbaum")
+        tbl.add_field(name="SpiritInTheSky", data_type="TEXT")
+        assert "SpiritInTheSky" in tbl.fields.keys()
+        tbl.delete_field(name="SpiritInTheSky")
+        assert not "SpiritInTheSky" in tbl.fields.keys()
+
+
+# ---------------------------------------------------------------------
+def test_fields_schema_change():
+    """tests the cached fields follow schema changes from any table object"""
+    with GeoPackage(path=":memory:") as gpkg:
+        tbl = gpkg.create(name="TheTornados")
+        assert "Telstar" not in tbl.fields.keys()
+        gpkg.get("TheTornados").add_field(name="Telstar", data_type="TEXT")
+        assert "Telstar" in tbl.fields.keys()
+
+
+# ---------------------------------------------------------------------
+def test_fields_schema_rollback():
+    """tests a rollback does not leave stale fields behind in the cache"""
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        a = gpkg.create(name="TheVentures", fields={"song": "TEXT"})
+        a.insert(row={"song": "Walk Don't Run"})
+        with pytest.raises(RuntimeError):
+            with a.edit_session():
+                a.add_field(name="artist", data_type="TEXT")
+                assert "artist" in a.fields
+                raise RuntimeError("undo")
+        # bumps schema_version back to the value cached inside the session
+        gpkg.create(name="TheChantays", fields={"song": "TEXT"})
+        assert "artist" not in a.fields
+        a.add_field(name="year", data_type="INTEGER")
+        a.delete_field("song")
+        assert "song" not in a.fields and "year" in a.fields
+        assert a.count() == 1
+
+
+# ---------------------------------------------------------------------
+def test_property_attribute_table():
+    """tests the dtype property on an attribute table"""
+    with GeoPackage(path=":memory:") as gpkg:
+        tbl = gpkg.create(name="NapoleonXIV")
+        assert tbl.dtype == "attribute"
+
+
+# ---------------------------------------------------------------------
+def test_property_spatial_table():
+    """tests the dtype property on an attribute table"""
+    with GeoPackage(path=":memory:") as gpkg:
+        tbl = gpkg.create(name="NapoleonXIV", wkid=4326, geometry_type="point")
+        assert tbl.dtype == "spatial"
+        assert tbl.wkid == 4326
+        assert tbl.geometry_type.lower() == "point"
+
+
+# ---------------------------------------------------------------------
+def test_rows_table():
+    """tests the dtype property on an attribute table"""
+    data = [
+        {"song": "Midnight Mary", "artist": "Joey Powers"},
+        {"song": "What Kind of Fool", "artist": "The Murmaids"},
+        {"song": "Hippy Hippy Shake", "artist": "The Swinging Blue Jeans"},
+    ]
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders", fields={"song": "TEXT", "artist": "TEXT"}
+        )
+        assert tbl.insert_many(data)
+        assert tbl.count() == 3
+        assert sum(1 for _ in tbl.rows()) == 3
+        assert tbl.count(where="""song = 'Midnight Mary'""") == 1
+        assert tbl.count(where=("song = ?", ["Midnight Mary"])) == 1
+        where = ("song = ?", ["Midnight Mary"])
+        row = next(tbl.rows(where=where, fields=["artist"]))
+        assert row.keys() == ["artist", "OBJECTID"]
+        assert row.values() == ["Joey Powers", 1]
+        row = tbl.first(where=where, fields=["artist"])
+        assert row.values() == ["Joey Powers", 1]
+        row["artist"] = "The Murmaids"
+        assert tbl.first(where="OBJECTID = 1")["artist"] == "The Murmaids"
+        assert tbl.first(where=("song = ?", ["Louie Louie"])) is None
+
+
+# ---------------------------------------------------------------------
+def test_insert_many_table():
+    """tests inserting a list of rows in batches"""
+    data = [
+        {"song": "Come On Eileen", "artist": "Dexys Midnight Runners"},
+        {"song": "Take On Me", "artist": "a-ha"},
+        {"song": "Mickey", "artist": "Toni Basil"},
+    ]
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders", fields={"song": "TEXT", "artist": "TEXT"}
+        )
+        assert tbl.insert(row=data, batch_size=2)
+        assert tbl.count() == 3
+        with pytest.raises(ValueError):
+            tbl.insert(row=[{"song": "Tainted Love"}, {"artist": "Soft Cell"}])
+
+
+# ---------------------------------------------------------------------
+def test_insert_multirow_table():
+    """tests inserts spanning several multi-row statements and a tail"""
+    data = [{"song": "Track %s" % i, "rank": i} for i in range(131)]
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(name="Top100", fields={"song": "TEXT", "rank": "INTEGER"})
+        assert tbl.insert(row=data, batch_size=100)
+        rows = list(tbl.rows_fast())
+        assert [row.rank for row in rows] == list(range(131))
+        assert [row.OBJECTID for row in rows] == list(range(1, 132))
+
+
+# ---------------------------------------------------------------------
+def test_rows_fast_table():
+    """tests the read-only named tuple row iterator"""
+    data = [
+        {"song": "Midnight Mary", "artist": "Joey Powers"},
+        {"song": "What Kind of Fool", "artist": "The Murmaids"},
+        {"song": "Hippy Hippy Shake", "artist": "The Swinging Blue Jeans"},
+    ]
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders", fields={"song": "TEXT", "artist": "TEXT"}
+        )
+        tbl.insert(row=data)
+        rows = list(tbl.rows_fast(arraysize=2))
+        assert len(rows) == 3
+        assert rows[2].artist == "The Swinging Blue Jeans"
+        rows = list(tbl.rows_fast(where="OBJECTID = 1", fields=["song"]))
+        assert rows == [("Midnight Mary",)]
+
+
+# ---------------------------------------------------------------------
+def test_rows_fields_list():
+    """tests the fields list is not modified and is validated"""
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(name="TheChiffons", fields={"song": "TEXT"})
+        tbl.insert(row={"song": "He's So Fine"})
+        fields = ["song"]
+        for _ in range(2):
+            row = next(tbl.rows(fields=fields))
+            assert row.keys() == ["song", "OBJECTID"]
+        assert fields == ["song"]
+        with pytest.raises(ValueError):
+            list(tbl.rows(fields=["album"]))
+
+
+# ---------------------------------------------------------------------
+def test_rows_arraysize():
+    """tests rows are fetched in batches of arraysize"""
+    data = [
+        {"song": "He's So Fine"},
+        {"song": "One Fine Day"},
+        {"song": "Sweet Talkin' Guy"},
+    ]
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(name="TheChiffons", fields={"song": "TEXT"})
+        tbl.insert(row=data)
+        tbl.arraysize = 2
+        assert [row["song"] for row in tbl.rows()] == [d["song"] for d in data]
+        with pytest.raises(ValueError):
+            tbl.arraysize = 0
+
+
+# ---------------------------------------------------------------------
+def test_rows_where_params():
+    """tests where clauses with bound parameters"""
+    data = [
+        {"song": "Midnight Mary", "artist": "Joey Powers"},
+        {"song": "What Kind of Fool", "artist": "The Murmaids"},
+    ]
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders", fields={"song": "TEXT", "artist": "TEXT"}
+        )
+        tbl.insert(row=data)
+        where = ("artist = ?", ["The Murmaids"])
+        assert [row["song"] for row in tbl.rows(where=where)] == ["What Kind of Fool"]
+        assert [row.song for row in tbl.rows_fast(where=where)] == ["What Kind of Fool"]
+        assert list(tbl.to_pandas(where=where)["song"]) == ["What Kind of Fool"]
+
+
+# ---------------------------------------------------------------------
+def test_row_batches():
+    """tests rows are returned as lists of editable rows"""
+    data = [{"song": "Track %s" % i} for i in range(5)]
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(name="Top100", fields={"song": "TEXT"})
+        tbl.insert(row=data)
+        batches = list(tbl.row_batches(batch_size=2))
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        batches[2][0]["song"] = "Last Track"
+        assert next(tbl.rows(where="OBJECTID = 5"))["song"] == "Last Track"
+
+
+# ---------------------------------------------------------------------
+def test_rows_spatial_table():
+    """tests the spatial insert on an attribute table"""
+
+    data = [
+        {"song": "Midnight Mary", "artist": "Joey Powers", "SHAPE": point},
+        {
+            "song": "What Kind of Fool",
+            "artist": "The Murmaids",
+            "SHAPE": POINT_WKB,
+        },
+    ]
+
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT", "artist": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        with tbl.edit_session():
             tbl.insert(row=data[0])
             tbl.insert(row=data[1])
-            assert len([row for row in tbl.rows()]) == 2
-        os.remove("sample1960s.gpkg")
-
-    # ----------------------------------------------------------------------
-    @requires_dependency(name="arcgis")
-    def test_to_df(self):
-        """Tests converting to a Spatially Enabled DataFrame"""
-        import copy
-        from geopackage._wkb import dumps, loads, load, dump
-
-        data = [
-            {"song": "Midnight Mary", "artist": "Joey Powers", "SHAPE": point},
-            {
-                "song": "What Kind of Fool",
-                "artist": "The Murmaids",
-                "SHAPE": dumps(obj=point, big_endian=False),
-            },
+        assert tbl.count() == 2
+
+
+# ----------------------------------------------------------------------
+def test_insert_many_spatial_table():
+    """tests the bulk insert on a spatial table"""
+    data = [
+        {"song": "Midnight Mary", "SHAPE": point},
+        {"song": "What Kind of Fool", "SHAPE": None},
+        {"song": "Hippy Hippy Shake", "SHAPE": point},
+    ]
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        assert tbl.insert_many(rows=data, batch_size=2)
+        rows = list(tbl.rows())
+        assert [row["song"] for row in rows] == [d["song"] for d in data]
+        assert rows[0]["Shape"] == rows[2]["Shape"]
+        assert data[1]["SHAPE"] is None
+
+
+# ----------------------------------------------------------------------
+@requires_dependency(name="numpy")
+def test_insert_columns():
+    """tests the columnar insert on a table and a spatial table"""
+    import numpy as np
+
+    songs = ["Midnight Mary", "Hey Paula", "Hippy Hippy Shake"]
+    with GeoPackage(path="sample1960s.gpkg", overwrite=True) as gpkg:
+        tbl = gpkg.create(name="Charts", fields={"song": "TEXT", "rank": "SHORT"})
+        assert tbl.insert_columns(
+            {"song": songs, "rank": np.arange(1, 4, dtype="int16")}, batch_size=2
+        )
+        assert [(r["song"], r["rank"]) for r in tbl.rows()] == list(
+            zip(songs, [1, 2, 3])
+        )
+        with pytest.raises(ValueError):
+            tbl.insert_columns({"song": songs, "rank": [1]})
+        stbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        stbl.insert_columns({"song": songs, "SHAPE": [point, None, point]})
+        stbl.insert(row={"song": "Wipe Out", "SHAPE": POINT_WKB})
+        shapes = [r["Shape"] for r in stbl.rows()]
+        assert shapes[0] == shapes[2] == shapes[3] != shapes[1]
+
+
+# ----------------------------------------------------------------------
+@requires_dependency(name="pyarrow")
+def test_insert_arrow():
+    """tests inserting a pyarrow table"""
+    import pyarrow as pa
+
+    wkb = POINT_WKB
+    data = pa.table({"song": ["Hey Paula", "Wipe Out"], "SHAPE": [wkb, None]})
+    with GeoPackage(path="sample1960s.gpkg", overwrite=True) as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        assert tbl.insert_arrow(data, batch_size=1)
+        rows = list(tbl.rows())
+        assert [r["song"] for r in rows] == ["Hey Paula", "Wipe Out"]
+        assert rows[0]["Shape"][8:] == wkb
+
+
+# ----------------------------------------------------------------------
+def test_insert_wkb_spatial_table():
+    """tests WKB, GeoPackage binary and NULL shapes are written as given"""
+
+    wkb = POINT_WKB
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        tbl.insert(row={"song": "Midnight Mary", "SHAPE": wkb})
+        gpb = next(tbl.rows())["Shape"]
+        with tbl.edit_session():
+            tbl.insert(row={"song": "What Kind of Fool", "SHAPE": gpb})
+            tbl.insert(row={"song": "Hippy Hippy Shake", "SHAPE": wkb.hex()})
+            tbl.insert(row={"song": "Hey Paula", "SHAPE": None})
+        shapes = [row["Shape"] for row in tbl.rows()]
+        assert shapes[:3] == [gpb, gpb, gpb]
+        assert gpb[8:] == wkb
+        assert shapes[3][8:] == struct.pack("<d", float("nan"))
+
+
+# ----------------------------------------------------------------------
+def test_spatial_sql_functions():
+    """tests the ST_* functions are registered on the connection"""
+    with GeoPackage(path="sample1960s.gpkg", overwrite=True) as gpkg:
+        tbl = gpkg.create(name="TheTokens", geometry_type="point", wkid=4326)
+        tbl.insert(row=[{"SHAPE": point}, {"SHAPE": None}])
+        sql = "SELECT ST_MinX(Shape), ST_MaxY(Shape), ST_IsEmpty(Shape) FROM TheTokens"
+        assert gpkg._con.execute(sql).fetchall() == [
+            (point["x"], point["y"], 0),
+            (None, None, 1),
         ]
 
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(
-                name="OneHitWonders",
-                fields={"song": "TEXT", "artist": "TEXT"},
-                geometry_type="point",
-                wkid=4326,
-            )
+
+# ----------------------------------------------------------------------
+@requires_dependency(name="arcgis")
+def test_to_df():
+    """Tests converting to a Spatially Enabled DataFrame"""
+
+    data = [
+        {"song": "Midnight Mary", "artist": "Joey Powers", "SHAPE": point},
+        {
+            "song": "What Kind of Fool",
+            "artist": "The Murmaids",
+            "SHAPE": POINT_WKB,
+        },
+    ]
+
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT", "artist": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        with tbl.edit_session():
             tbl.insert(row=data[0])
             tbl.insert(row=data[1])
-            df = tbl.to_pandas()
-            assert len(df) == 2
-            df = tbl.to_pandas(ftype="esri")
-            assert df.spatial.name == "Shape"
-        os.remove("sample1960s.gpkg")
+        df = tbl.to_pandas()
+        assert len(df) == 2
+        df = tbl.to_pandas(ftype="esri")
+        assert df.spatial.name == "Shape"
+
+
+# ----------------------------------------------------------------------
+@requires_dependency(name="shapely")
+def test_to_df_shapely():
+    """Tests converting to a DataFrame of shapely geometries"""
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT", "artist": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        tbl.insert(
+            row={"song": "Midnight Mary", "artist": "Joey Powers", "SHAPE": point}
+        )
+        df = tbl.to_pandas(ftype="shapely")
+        assert len(df) == 1
+        assert df["Shape"][0].x == point["x"]
+
+
+# ----------------------------------------------------------------------
+@requires_dependency(name="shapely")
+def test_insert_wkt_geojson_shapely():
+    """Tests inserting WKT and GeoJSON geometries through shapely"""
+    data = [
+        {"song": "Midnight Mary", "SHAPE": "POINT (-118.15 33.8)"},
+        {"song": "What Kind of Fool", "SHAPE": "POINT (-97.06 32.83)"},
+    ]
+    with GeoPackage(path="sample1960s.gpkg", use_shapely=True) as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        tbl.insert(row=data, geom_format="WKT")
+        tbl.insert(
+            row={
+                "song": "Hippy Hippy Shake",
+                "SHAPE": {"type": "Point", "coordinates": [-1.0, 2.0]},
+            },
+            geom_format="GeoJSON",
+        )
+        df = tbl.to_pandas(ftype="shapely")
+        assert list(df["Shape"].apply(lambda g: g.x)) == [-118.15, -97.06, -1.0]
 
 
 ########################################################################
-class TestWKBGeometry(unittest.TestCase):
-    """Tests the Geometry Ops"""
+# Tests the Geometry Ops
+########################################################################
+@requires_dependency(name="arcpy")
+def test_wkb_arcpy():
 
-    @requires_dependency(name="arcpy")
-    def test_wkb_arcpy(self):
-        from geopackage._wkb import dumps, loads, load, dump
+    import arcpy
 
-        import arcpy
+    sr = arcpy.SpatialReference(4326)
+    wkbs = [
+        POINT_WKB,
+        POLYLINE_WKB,
+        MULTIPOINT_WKB,
+        POLYGON_WKB,
+    ]
+    for wkb in wkbs:
+        assert arcpy.FromWKB(bytearray(wkb), sr)
 
-        sr = arcpy.SpatialReference(4326)
-        wkbs = [
-            dumps(obj=point, big_endian=False),
-            dumps(polyline, big_endian=False),
-            dumps(multipoint, big_endian=False),
-            dumps(polygon, big_endian=False),
-        ]
-        for wkb in wkbs:
-            assert arcpy.FromWKB(bytearray(wkb), sr)
 
-    ##----------------------------------------------------------------------
-    # @requires_dependency(name='shapely')
-    # def test_wkb_arcpy(self):
-    # from geopackage._wkb import dumps, loads, load, dump
-    # import shapely
+# ----------------------------------------------------------------------
+def test_rtree_envelope():
+    """tests the envelope functions read the GeoPackage binary"""
+
+    header = b"GP\x00\x01" + (4326).to_bytes(4, "little")
+    gpb = header + POLYLINE_WKB
+    xs = [xy[0] for path in polyline["paths"] for xy in path]
+    ys = [xy[1] for path in polyline["paths"] for xy in path]
+    assert ST_MinX(gpb) == min(xs) and ST_MaxX(gpb) == max(xs)
+    assert ST_MinY(gpb) == min(ys) and ST_MaxY(gpb) == max(ys)
+    assert ST_IsEmpty(gpb) == 0
+    assert ST_IsEmpty(header + NULL_WKB) == 1
+    assert ST_MinX(header + NULL_WKB) is None
+    envelope = struct.pack("<4d", min(xs), max(xs), min(ys), max(ys))
+    gpb = b"GP\x00\x03" + header[4:] + envelope + gpb[8:]
+    assert ST_MinX(gpb) == min(xs) and ST_MaxY(gpb) == max(ys)
 
-    # import arcpy
-    # sr = arcpy.SpatialReference(4326)
-    # wkbs = [dumps(obj=point, big_endian=False),
-    # dumps(polyline, big_endian=False),
-    # dumps(multipoint, big_endian=False),
-    # dumps(polygon, big_endian=False)]
-    # for wkb in wkbs:
-    # assert arcpy.FromWKB(bytearray(wkb), sr)
+
+# ----------------------------------------------------------------------
+def test_prj_sqlite_fallback(tmp_path, monkeypatch):
+    """tests lookups use a matching prj.sqlite and fall back to prj.json"""
+
+    db = tmp_path / "prj.sqlite"
+    version = "PRAGMA user_version=%s;" % _coord._prj_checksum()
+    con = sqlite3.connect(str(db))
+    con.execute("CREATE TABLE prj (wkid INTEGER PRIMARY KEY, name TEXT, wkt TEXT)")
+    con.execute("INSERT INTO prj VALUES (4326, 'FromSqlite', 'GEOGCS[]')")
+    con.commit()
+    con.close()
+    monkeypatch.setattr(_coord, "_DB", db)
+    try:
+        # a matching index, a stale index and an index missing its table
+        for setup in (version, "PRAGMA user_version=1;", "DROP TABLE prj;" + version):
+            con = sqlite3.connect(str(db))
+            con.executescript(setup)
+            con.close()
+            _coord._connect.cache_clear()
+            monkeypatch.setattr(_coord, "_records", {})
+            name = _coord.lookup_coordinate_system(4326)[0].NAME
+            assert name == ("FromSqlite" if setup == version else "GCS_WGS_1984")
+        db.write_bytes(b"not a database")
+        _coord._connect.cache_clear()
+        assert _coord._connect() is None
+    finally:
+        _coord._connect.cache_clear()
+
+
+# ----------------------------------------------------------------------
+def test_esrijson_to_wkb():
+    """tests the numpy packing matches the struct based dumps"""
+
+    shapes = [polyline, polygon, multipoint]
+    points = [{"x": i, "y": -i} for i in range(5)]
+    wkbs = _wkb.esrijson_to_wkb(shapes)
+    pts = _wkb.esrijson_to_wkb(points)
+    hasnumpy = _wkb._HASNUMPY
+    _wkb._HASNUMPY = False
+    try:
+        assert wkbs == [_wkb.dumps(g, False) for g in shapes]
+        assert pts == [_wkb.dumps(g, False) for g in points]
+    finally:
+        _wkb._HASNUMPY = hasnumpy
+
+
+##----------------------------------------------------------------------
+# @requires_dependency(name='shapely')
+# def test_wkb_arcpy():
+# from geopackage._wkb import dumps, loads, load, dump
+# import shapely
+
+# import arcpy
+# sr = arcpy.SpatialReference(4326)
+# wkbs = [dumps(obj=point, big_endian=False),
+# dumps(polyline, big_endian=False),
+# dumps(multipoint, big_endian=False),
+# dumps(polygon, big_endian=False)]
+# for wkb in wkbs:
+# assert arcpy.FromWKB(bytearray(wkb), sr)
 
 
 ########################################################################
-class TestRowClass(unittest.TestCase):
-    """
-    Tests the row object
-    """
+# Tests the row object
+########################################################################
+# ---------------------------------------------------------------------
+def test_rows_update_table():
+    """tests updating attribute values through a row"""
+    with GeoPackage(path=":memory:") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders", fields={"song": "TEXT", "artist": "TEXT"}
+        )
+        tbl.insert(row={"song": "Midnight Mary", "artist": "Joey Powers"})
+        for row in tbl.rows():
+            row["artist"] = "The Murmaids"
+            row["song"] = "Popsicles and Icicles"
+        row = next(tbl.rows())
+        assert row.values() == [1, "Popsicles and Icicles", "The Murmaids"]
 
-    # ---------------------------------------------------------------------
-    def test_rows_table(self):
-        """tests the dtype property on an attribute table"""
-        data = [
-            {"song": "Midnight Mary", "artist": "Joey Powers"},
-            {"song": "What Kind of Fool", "artist": "The Murmaids"},
-            {"song": "Hippy Hippy Shake", "artist": "The Swinging Blue Jeans"},
-        ]
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(
-                name="OneHitWonders", fields={"song": "TEXT", "artist": "TEXT"}
-            )
-            tbl.insert(row=data[0])
-            tbl.insert(row=data[1])
-            tbl.insert(row=data[2])
-            assert len([row for row in tbl.rows()]) == 3
-            assert (
-                len([row for row in tbl.rows(where="""song = 'Midnight Mary'""")]) == 1
-            )
-            row = [
-                row
-                for row in tbl.rows(
-                    where="""song = 'Midnight Mary'""", fields=["artist"]
-                )
-            ][0]
-            assert row.keys() == ["artist", "OBJECTID"]
-            assert row.values() == row.values() == ["Joey Powers", 1]
-        os.remove("sample1960s.gpkg")
-
-    # ---------------------------------------------------------------------
-    def test_rows_update_geom_spatial_table(self):
-        """tests the spatial insert on an attribute table"""
-        import copy
-        from geopackage._wkb import dumps, loads, load, dump
-
-        data = [
-            {"song": "Midnight Mary", "artist": "Joey Powers", "Shape": point},
-            {
-                "song": "What Kind of Fool",
-                "artist": "The Murmaids",
-                "Shape": dumps(obj=point, big_endian=False),
-            },
-        ]
-        npoint = copy.deepcopy(point)
-        npoint["x"] = -1
-        npoint["y"] = -2
-
-        with GeoPackage(path="sample1960s.gpkg") as gpkg:
-            tbl = gpkg.create(
-                name="OneHitWonders",
-                fields={"song": "TEXT", "artist": "TEXT"},
-                geometry_type="point",
-                wkid=4326,
-            )
-            tbl.insert(row=data[0])
-            # tbl.insert(row=data[1])
-            # assert len([row for row in tbl.rows()]) == 2
 
+# ---------------------------------------------------------------------
+def test_rows_edit_session():
+    """tests committing and rolling back edits in an edit session"""
+    data = [
+        {"song": "Midnight Mary", "artist": "Joey Powers"},
+        {"song": "What Kind of Fool", "artist": "The Murmaids"},
+    ]
+    with GeoPackage(path=":memory:") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders", fields={"song": "TEXT", "artist": "TEXT"}
+        )
+        tbl.insert(row=data)
+        with tbl.edit_session():
             for row in tbl.rows():
-                isinstance(row, _Row)
+                row["artist"] = row["artist"].upper()
+        assert [row["artist"] for row in tbl.rows()] == [
+            "JOEY POWERS",
+            "THE MURMAIDS",
+        ]
+        with pytest.raises(RuntimeError):
+            with tbl.edit_session():
+                for row in tbl.rows():
+                    row.delete()
+                raise RuntimeError("undo")
+        assert tbl.count() == 2
+
+
+# ---------------------------------------------------------------------
+def test_edit_session_shared_connection():
+    """tests a session rolls back writes made through every table"""
+    with GeoPackage(path="sample1960s.gpkg") as gpkg:
+        a = gpkg.create(name="TheTrashmen", fields={"song": "TEXT"})
+        b = gpkg.create(name="TheSurfaris", fields={"song": "TEXT"})
+        with pytest.raises(RuntimeError):
+            with a.edit_session():
+                a.insert(row={"song": "Surfin' Bird"})
+                b.insert(row={"song": "Wipe Out"})
+                with b.edit_session():
+                    b.insert(row={"song": "Surfer Joe"})
+                a.add_field(name="artist", data_type="TEXT")
+                gpkg.create(name="TheRivieras")
+                raise RuntimeError("undo")
+        assert a.count() == 0 and b.count() == 0
+        assert "artist" not in a.fields
+        assert gpkg.exists("TheRivieras") == False
+        with a.edit_session():
+            a.insert(row={"song": "Surfin' Bird"})
+            b.insert(row={"song": "Wipe Out"})
+        assert a.count() == 1 and b.count() == 1
+        gpkg._con.execute("BEGIN")
+        with pytest.raises(RuntimeError):
+            with a.edit_session():
+                pass
+        gpkg._con.rollback()
+
+
+# ---------------------------------------------------------------------
+def test_rows_update_geom_spatial_table():
+    """tests the spatial insert on an attribute table"""
+
+    data = [
+        {"song": "Midnight Mary", "artist": "Joey Powers", "Shape": point},
+        {
+            "song": "What Kind of Fool",
+            "artist": "The Murmaids",
+            "Shape": POINT_WKB,
+        },
+    ]
+    npoint = copy.deepcopy(point)
+    npoint["x"] = -1
+    npoint["y"] = -2
+
+    with GeoPackage(path=":memory:") as gpkg:
+        tbl = gpkg.create(
+            name="OneHitWonders",
+            fields={"song": "TEXT", "artist": "TEXT"},
+            geometry_type="point",
+            wkid=4326,
+        )
+        tbl.insert(row=data[0])
+        # tbl.insert(row=data[1])
+        # assert tbl.count() == 2
+
+        for row in tbl.rows():
+            isinstance(row, _Row)
+
+            row["Shape"] = npoint
+            break
+        shape = next(tbl.rows())["Shape"]
+        assert shape[:8] == b"GP\x00\x01" + (4326).to_bytes(4, "little")
+        assert shape[8:] == dumps(obj=npoint, big_endian=False)
+
 
-                row["Shape"] = npoint
-                break
-        os.remove("sample1960s.gpkg")
+if __name__ == "__main__":
+    pytest.main([__file__])